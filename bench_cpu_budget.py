@@ -0,0 +1,212 @@
+"""
+Benchmark detection fps and audio underruns under different CPU core budgets.
+
+Each configuration runs in its own process, because thread-pool sizes only take
+effect before torch starts its threads. The process runs detection on a video
+(or a synthetic frame) for a fixed time while an audio thread keeps a
+low-latency output stream fed, and reports frames per second and how often the
+audio missed its deadline:
+
+    default   torch and OpenCV pick their own thread counts, nothing pinned
+    threads   thread pools sized to the inference cores, nothing pinned
+    pinned    thread pools sized and inference/audio pinned to separate cores
+
+Usage:
+    python bench_cpu_budget.py
+    python bench_cpu_budget.py --source Source/vid.mp4 --seconds 30 --configs default pinned
+    python bench_cpu_budget.py --simulated-audio   # no sound card needed
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from cpu_budget import CoreBudget
+
+CONFIGS = ["default", "threads", "pinned"]
+AUDIO_RATE = 48000
+AUDIO_BLOCK = 256  # Frames per audio block (about 5 ms at 48 kHz)
+
+
+class SoundcardAudio:
+    """Plays a quiet tone through sounddevice and counts output underflows."""
+
+    def __init__(self):
+        import sounddevice as sd
+        self.underruns = 0
+        self.blocks = 0
+        self._phase = 0
+        self.stream = sd.OutputStream(samplerate=AUDIO_RATE, blocksize=AUDIO_BLOCK, channels=1,
+                                      dtype="float32", latency="low", callback=self._callback)
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.underruns += 1
+        t = (self._phase + np.arange(frames)) / AUDIO_RATE
+        outdata[:, 0] = 0.01 * np.sin(2 * np.pi * 440 * t)
+        self._phase += frames
+        self.blocks += 1
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+        self.stream.close()
+
+
+class SimulatedAudio:
+    """A thread that must render one block per period; a late block counts as an underrun."""
+
+    def __init__(self):
+        self.underruns = 0
+        self.blocks = 0
+        self._running = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        period = AUDIO_BLOCK / AUDIO_RATE
+        deadline = time.perf_counter() + period
+        phase = 0
+        while self._running:
+            t = (phase + np.arange(AUDIO_BLOCK)) / AUDIO_RATE
+            np.sin(2 * np.pi * 440 * t)
+            phase += AUDIO_BLOCK
+            self.blocks += 1
+            now = time.perf_counter()
+            if now > deadline:
+                self.underruns += 1
+                deadline = now  # Start over instead of counting the same stall repeatedly
+            else:
+                time.sleep(deadline - now)
+            deadline += period
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+
+def make_budget(config):
+    if config == "threads":
+        return CoreBudget(pin=False)
+    if config == "pinned":
+        return CoreBudget()
+    return None
+
+
+def run_config(config, model_name, source, seconds, simulated_audio):
+    """Run one configuration in this process and return its measurements."""
+    budget = make_budget(config)
+    if budget is not None:
+        budget.configure_environment()
+        budget.pin_current_thread("inference")
+
+    import cv2
+    import torch
+    from ultralytics import YOLO
+    if budget is not None:
+        budget.apply_thread_limits()
+
+    model = YOLO(model_name)
+    capture = cv2.VideoCapture(source) if source is not None else None
+    synthetic = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    def next_frame():
+        if capture is None:
+            return synthetic
+        ok, frame = capture.read()
+        if not ok:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = capture.read()
+        return frame
+
+    model(next_frame(), verbose=False)  # Warm-up
+
+    # The audio thread opens its stream after pinning, so PortAudio's callback thread inherits the audio cores
+    audio_box = {}
+    audio_started = threading.Event()
+
+    def start_audio():
+        if budget is not None:
+            budget.pin_current_thread("audio")
+        audio = SimulatedAudio() if simulated_audio else SoundcardAudio()
+        audio.start()
+        audio_box["audio"] = audio
+        audio_started.set()
+
+    threading.Thread(target=start_audio, daemon=True).start()
+    audio_started.wait()
+    audio = audio_box["audio"]
+
+    frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        frame = next_frame()
+        results = model(frame, verbose=False)
+        cv2.resize(results[0].plot(), (1280, 720))
+        frames += 1
+    elapsed = time.perf_counter() - start
+    audio.stop()
+
+    return {
+        "config": config,
+        "budget": budget.describe() if budget is not None else "no limits",
+        "torch_threads": torch.get_num_threads(),
+        "cv2_threads": cv2.getNumThreads(),
+        "fps": frames / elapsed,
+        "audio_blocks": audio.blocks,
+        "underruns": audio.underruns,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CPU core budgets by detection fps and audio underruns.")
+    parser.add_argument("--configs", nargs="+", choices=CONFIGS, default=CONFIGS)
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--source", default=None, help="Video file or camera index; default: a synthetic frame")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Measurement time per configuration")
+    parser.add_argument("--simulated-audio", action="store_true", help="Use a deadline-driven thread instead of the sound card")
+    parser.add_argument("--child", choices=CONFIGS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source is not None and args.source.isdigit() else args.source
+    if args.child:
+        result = run_config(args.child, args.model, source, args.seconds, args.simulated_audio)
+        print("RESULT " + json.dumps(result))
+        return
+
+    results = []
+    for config in args.configs:
+        print(f"Running {config}...")
+        command = [sys.executable, os.path.abspath(__file__), "--child", config, "--model", args.model,
+                   "--seconds", str(args.seconds)]
+        if args.source is not None:
+            command += ["--source", args.source]
+        if args.simulated_audio:
+            command.append("--simulated-audio")
+        output = subprocess.run(command, capture_output=True, text=True)
+        lines = [line for line in output.stdout.splitlines() if line.startswith("RESULT ")]
+        if output.returncode != 0 or not lines:
+            print(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else f"{config} failed")
+            continue
+        result = json.loads(lines[-1][len("RESULT "):])
+        print(f"  {result['budget']}")
+        results.append(result)
+
+    print()
+    print(f"{'config':<10}{'torch':>7}{'cv2':>5}{'fps':>8}{'blocks':>9}{'underruns':>11}{'rate':>8}")
+    for r in results:
+        rate = r["underruns"] / r["audio_blocks"] if r["audio_blocks"] else 0.0
+        print(f"{r['config']:<10}{r['torch_threads']:>7}{r['cv2_threads']:>5}{r['fps']:>8.1f}"
+              f"{r['audio_blocks']:>9}{r['underruns']:>11}{rate:>8.2%}")
+
+
+if __name__ == "__main__":
+    main()
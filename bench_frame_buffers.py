@@ -0,0 +1,108 @@
+"""
+Measure per-frame allocations of the video path with and without buffer reuse.
+
+    before  capture into a new array, annotate a copy (as results.plot() does),
+            cv2.resize to the screen and cv2.copyMakeBorder to letterbox
+    after   capture into a FramePool buffer, draw in place and resize into a
+            preallocated ScreenCanvas
+
+Both paths are run over the same frames and report bytes allocated per frame,
+memory held at the start and end, frames per second and garbage collections.
+
+Usage:
+    python bench_frame_buffers.py --source Source/vid.mp4 --frames 500
+    python bench_frame_buffers.py --source 0 --screen 1920x1080 --model yolov8n.pt
+"""
+import argparse
+import gc
+import time
+import cv2
+import numpy as np
+from buffer_pool import AllocationMeter, FramePool, ScreenCanvas
+from detector import draw_detections
+
+EMPTY = np.zeros((0, 6), dtype=np.float32)
+
+
+def letterbox_with_border(frame, width, height):
+    """The allocating letterbox caller_ui used before ScreenCanvas."""
+    h, w = frame.shape[:2]
+    scale = min(width / w, height / h)
+    new_w, new_h = int(w * scale), int(h * scale)
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return cv2.copyMakeBorder(resized, (height - new_h) // 2, (height - new_h + 1) // 2,
+                              (width - new_w) // 2, (width - new_w + 1) // 2,
+                              cv2.BORDER_CONSTANT, value=(0, 0, 0))
+
+
+def run(path, source, frames, screen, detector):
+    capture = cv2.VideoCapture(source)
+    ok, first = capture.read()
+    if not ok:
+        raise SystemExit(f"Cannot read from {source}")
+    names = detector.names if detector is not None else {}
+    pool = FramePool(first.shape, count=2)
+    canvas = ScreenCanvas(*screen)
+    meter = AllocationMeter()
+    gc.collect()
+    collections_before = sum(s["collections"] for s in gc.get_stats())
+    held_before = meter.traced_bytes()
+
+    frame = None
+    start = time.perf_counter()
+    for _ in range(frames):
+        meter.begin()
+        if path == "before":
+            ok, frame = capture.read()
+        else:
+            buffer = pool.acquire()
+            ok, frame = capture.read(buffer)
+        if not ok:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            meter.end()
+            continue
+        detections = detector.detect(frame) if detector is not None else EMPTY
+        if path == "before":
+            annotated = draw_detections(frame.copy(), detections, names)
+            letterbox_with_border(annotated, *screen)
+        else:
+            draw_detections(frame, detections, names)
+            canvas.fit(frame)
+            pool.release(frame)
+        meter.end()
+    elapsed = time.perf_counter() - start
+
+    capture.release()
+    return {
+        "bytes_per_frame": meter.bytes_per_frame(),
+        "held_start": held_before,
+        "held_end": meter.traced_bytes(),
+        "fps": meter.frames / elapsed,
+        "gc": sum(s["collections"] for s in gc.get_stats()) - collections_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare frame allocations with and without buffer reuse.")
+    parser.add_argument("--source", default="0", help="Video file or camera index")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--screen", default="1920x1080", help="Screen size to letterbox to, WIDTHxHEIGHT")
+    parser.add_argument("--model", default=None, help="Also run detection with these weights")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    screen = tuple(int(v) for v in args.screen.lower().split("x"))
+    detector = None
+    if args.model:
+        from detector import YoloDetector
+        detector = YoloDetector(args.model)
+
+    print(f"{'path':<8}{'KB/frame':>10}{'held start MB':>15}{'held end MB':>13}{'fps':>8}{'gc runs':>9}")
+    for path in ("before", "after"):
+        r = run(path, source, args.frames, screen, detector)
+        print(f"{path:<8}{r['bytes_per_frame'] / 1024:>10.0f}{r['held_start'] / 2**20:>15.1f}"
+              f"{r['held_end'] / 2**20:>13.1f}{r['fps']:>8.1f}{r['gc']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark recognition latency and accuracy of the command recognizer backends.
+
+The clip directory holds recorded command WAVs and a transcripts.txt file with
+one "<file name><TAB><spoken phrase>" line per clip. Clips of background noise
+can be listed with an empty phrase; they count as correct when no command is
+recognized.
+
+Usage:
+    python bench_recognition.py recordings/commands
+    python bench_recognition.py recordings/commands --backends offline online hybrid
+"""
+import argparse
+import os
+import statistics
+import time
+import speech_recognition as sr
+from recognizer_backends import get_backend, match_command
+from voice_activity import vad
+
+
+def load_clips(clip_dir):
+    """Return (path, expected command) pairs listed in transcripts.txt."""
+    clips = []
+    with open(os.path.join(clip_dir, "transcripts.txt"), encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            name, _, phrase = line.partition("\t")
+            clips.append((os.path.join(clip_dir, name), match_command(phrase.lower())))
+    return clips
+
+
+def run_backend(backend, clips, use_vad):
+    """Recognize every clip and return (latencies in ms, correct count, error count)."""
+    recognizer = sr.Recognizer()
+    latencies = []
+    correct = 0
+    errors = 0
+    for path, expected in clips:
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+
+        start = time.perf_counter()
+        command = None
+        try:
+            if use_vad:
+                audio = vad.gate(audio)
+            if audio is not None:
+                command = match_command(backend.recognize(recognizer, audio))
+        except sr.UnknownValueError:
+            pass
+        except sr.RequestError as e:
+            print(f"  {os.path.basename(path)}: {e}")
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if command == expected:
+            correct += 1
+        else:
+            print(f"  {os.path.basename(path)}: expected {expected!r}, got {command!r}")
+    return latencies, correct, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare command recognition backends on recorded WAVs.")
+    parser.add_argument("clip_dir", help="Directory with WAV files and transcripts.txt")
+    parser.add_argument("--backends", nargs="+", default=["offline", "online"],
+                        help="Backends to compare (offline, online, hybrid)")
+    parser.add_argument("--no-vad", action="store_true", help="Send whole clips without voice-activity gating")
+    args = parser.parse_args()
+
+    clips = load_clips(args.clip_dir)
+    print(f"{len(clips)} clips from {args.clip_dir}")
+
+    rows = []
+    for name in args.backends:
+        print(f"Running {name} backend...")
+        backend = get_backend(name)
+        latencies, correct, errors = run_backend(backend, clips, not args.no_vad)
+        rows.append((name, latencies, correct, errors))
+
+    print()
+    print(f"{'backend':<10}{'accuracy':>10}{'errors':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, latencies, correct, errors in rows:
+        if latencies:
+            ordered = sorted(latencies)
+            p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+            timing = f"{statistics.mean(latencies):>10.1f}{statistics.median(latencies):>10.1f}{p95:>10.1f}"
+        else:
+            timing = f"{'-':>10}{'-':>10}{'-':>10}"
+        accuracy = correct / len(clips) if clips else 0.0
+        print(f"{name:<10}{accuracy:>10.1%}{errors:>8}{timing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Preallocated frame buffers for the video path.
+
+Every frame used to allocate several full-size arrays: the captured frame, the
+annotated copy, the screen-sized resize and the letterboxed result. At camera
+frame rates that is hundreds of megabytes per second of allocator churn.
+FramePool hands out buffers sized to the negotiated camera resolution that
+capture reads into and that are recycled once a frame has been displayed or
+dropped; detections are drawn onto the frame in place; ScreenCanvas resizes
+straight into a preallocated screen-sized image whose border never changes.
+
+AllocationMeter measures the bytes allocated while processing each frame
+(numpy and OpenCV arrays are visible to tracemalloc), see bench_frame_buffers.py.
+"""
+import collections
+import threading
+import tracemalloc
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """Fixed set of equally shaped frame buffers, reused instead of reallocated."""
+
+    def __init__(self, shape, count, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.count = count
+        self._free = collections.deque(np.empty(self.shape, self.dtype) for _ in range(count))
+        self._lock = threading.Lock()
+        self.misses = 0  # Buffers allocated because every pooled one was in use
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            self.misses += 1
+        return np.empty(self.shape, self.dtype)
+
+    def release(self, buffer):
+        """Return `buffer` to the pool; foreign or surplus arrays are left to the garbage collector."""
+        if buffer is None or buffer.shape != self.shape or buffer.dtype != self.dtype:
+            return
+        with self._lock:
+            if len(self._free) < self.count:
+                self._free.append(buffer)
+
+
+class ScreenCanvas:
+    """Screen-sized image that frames are letterboxed into without new allocations."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.image = np.zeros((height, width, 3), dtype=np.uint8)
+        self._layout = None  # (frame size, destination view) of the last frame
+
+    def fit(self, frame, interpolation=cv2.INTER_AREA):
+        """Resize `frame` into the canvas, preserving its aspect ratio; returns the canvas."""
+        h, w = frame.shape[:2]
+        if self._layout is None or self._layout[0] != (w, h):
+            scale = min(self.width / w, self.height / h)
+            new_w, new_h = int(w * scale), int(h * scale)
+            left, top = (self.width - new_w) // 2, (self.height - new_h) // 2
+            self.image[:] = 0  # Black borders, only redrawn when the frame size changes
+            self._layout = ((w, h), self.image[top:top + new_h, left:left + new_w])
+        view = self._layout[1]
+        cv2.resize(frame, (view.shape[1], view.shape[0]), dst=view, interpolation=interpolation)
+        return self.image
+
+
+class AllocationMeter:
+    """Bytes allocated per frame, from tracemalloc's peak above the start of each frame."""
+
+    def __init__(self):
+        self.frames = 0
+        self.total_bytes = 0
+        self._start = 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def begin(self):
+        tracemalloc.reset_peak()
+        self._start = tracemalloc.get_traced_memory()[0]
+
+    def end(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.total_bytes += peak - self._start
+        self.frames += 1
+        return peak - self._start
+
+    def bytes_per_frame(self):
+        return self.total_bytes / self.frames if self.frames else 0.0
+
+    def traced_bytes(self):
+        """Memory currently held by Python and numpy allocations."""
+        return tracemalloc.get_traced_memory()[0]
@@ -1,100 +1,163 @@
-import cv2
+import os
 import threading
-import speech_recognition as sr
-from Base.detect import run_detection, speech_queue, audio_status, audio_lock
-from Base.detect_track import run_detection_tracking
 import time
+from startup import StartupTimer, run_in_parallel
+from tracing import tracer
+from cpu_budget import budget
+from mode_state import ModeState, after_interaction
+
+startup = StartupTimer()
+# Size torch's thread pool before it is imported; threads started from here on inherit the inference cores
+budget.configure_environment()
+budget.pin_current_thread("inference")
+# Headless load tests: SIM_COMMANDS names a command script, and simulated devices replace
+# the camera, microphone, speech output and display (see sim_devices.py)
+simulation = None
+if os.environ.get("SIM_COMMANDS"):
+    from sim_devices import Simulation
+    simulation = Simulation.from_environment()
+with startup.stage("import audio output"):
+    if simulation is not None:
+        speaker = simulation.speaker
+    else:
+        from phrase_cache import speaker
+
+# Heavy modules are imported by load_detection() and load_voice() after the "Starting" cue
+cv2 = None
+sr = None
 
 # Global variables to manage the mode and threading
-current_mode = "normal"  # Start in "normal" mode (detect.py)
-mode_lock = threading.Lock()
+# Mode, Find-mode target, announcements on/off and listening, published by handle_command() and read without locks
+mode_state = ModeState(mode="normal", target_class="person", announcements=True, listening=True)
 running = True
-listening_active = True  # To control the background listening loop
+microphone_ready = threading.Event()  # Set once background listening has started
+voice_loaded = threading.Event()  # Set once load_voice() has finished; a first-start backend probe waits for it
+listener_thread = None
+video_source = 0
+detection_server = None  # "host:port" of a detection_server.py to run the model on; None runs it locally
+pipeline = None  # Staged detection pipeline, started and warmed up by load_detection()
+vocabulary = None  # Spoken object names from Object_List.txt, set by load_voice()
+RECOGNIZER = "offline"  # Voice command recognizer: "offline" (pocketsphinx), "online" (Google) or "hybrid"
+recognizer_backend = None  # The RECOGNIZER backend, created by load_voice()
+streaming_listener = None  # None for online backends
+
+def open_microphone(**kwargs):
+    """An sr.Microphone, or the scripted one when simulating."""
+    if simulation is not None:
+        return simulation.microphone(**kwargs)
+    return sr.Microphone(**kwargs)
 
 def clear_speech_queue():
     """Clears the speech queue to stop ongoing speech."""
-    global speech_queue
-    while not speech_queue.empty():
-        try:
-            speech_queue.get_nowait()
-            speech_queue.task_done()
-        except Queue.Empty:
-            break
-    # Add a delay to ensure the speech thread processes the clear operation
-    time.sleep(0.2)
+    # Drop queued announcements and replies and cut off the one being spoken; returns once it is silent,
+    # including a phrase the speech thread was still rendering
+    speaker.clear()
 
 def handle_command(recognizer, audio):
     """
     Callback function to process recognized speech.
     """
-    global current_mode, running, listening_active, audio_status
+    # Called as soon as the background listener has captured the phrase
+    trace = tracer.begin()
+    trace.mark("wake-word audio end")
     try:
-        command = recognizer.recognize_google(audio).lower()
+        # Drop silence and background noise before it reaches the recognizer
+        with trace.span("voice activity gate"):
+            audio = vad.gate(audio)
+        if audio is None:
+            trace.cancel()
+            return
+        with trace.span("recognition"):
+            command = recognizer_backend.recognize(recognizer, audio)
+        trace.mark("recognition result", text=command)
         print(f"Recognized command: {command}")
 
         # Check for "Hello system"
-        if "hello system" in command:
+        with trace.span("intent match"):
+            wake = "hello system" in command
+        if wake:
             # Pause ongoing speech and object name announcements
-            with mode_lock:
-                with audio_lock:
-                    print("Pausing speech for interaction...")
-                    audio_status = False  # Stop object name announcements
-                clear_speech_queue()
-                # Speak the response
-                speech_queue.put("Heyy, how can I help you?")
-                print("System: Heyy, how can I help you?")
+            print("Pausing speech for interaction...")
+            mode_state.publish(announcements=False)  # Stop object name announcements
+            clear_speech_queue()
+            # Speak the response
+            trace.reply(speaker, "Heyy, how can I help you?")
+            print("System: Heyy, how can I help you?")
 
             # Wait to ensure the speech queue is processed
             time.sleep(0.5)
 
             # Temporarily stop background listening to focus on sub-command
-            listening_active = False
+            mode_state.publish(listening=False)
 
             # Listen for mode-switching command with up to 3 attempts
             attempts = 0
             max_attempts = 3
             command_recognized = False
             recognizer = sr.Recognizer()
-            with sr.Microphone() as source:
-                recognizer.adjust_for_ambient_noise(source)
+            with open_microphone(sample_rate=SPHINX_SAMPLE_RATE, chunk_size=512) as source:
+                # Reuse the background noise estimate instead of recalibrating
+                noise_floor.apply(recognizer)
                 while attempts < max_attempts:
                     try:
-                        # Increased timeout and phrase time limit for better user experience
-                        audio = recognizer.listen(source, timeout=2, phrase_time_limit=7)
-                        sub_command = recognizer.recognize_google(audio).lower()
+                        with trace.span("sub-command listen and recognition", attempt=attempts + 1):
+                            if streaming_listener is not None:
+                                # Act on the partial result as soon as the command is unambiguous
+                                sub_command = streaming_listener.listen(source, timeout=2, phrase_time_limit=7)
+                                if streaming_listener.last_latency is not None:
+                                    print(f"Command resolved {streaming_listener.last_latency * 1000:.0f} ms after speech")
+                            else:
+                                # Increased timeout and phrase time limit for better user experience
+                                audio = recognizer.listen(source, timeout=2, phrase_time_limit=7)
+                                audio = vad.gate(audio)
+                                if audio is None:
+                                    raise sr.WaitTimeoutError("No speech in captured audio")
+                                sub_command = recognizer_backend.recognize(recognizer, audio)
+                        trace.mark("recognition result", text=sub_command)
                         print(f"Recognized sub-command: {sub_command}")
+                        with trace.span("intent match"):
+                            target = vocabulary.resolve(sub_command)
 
-                        with mode_lock:
-                            if "find mode on" in sub_command:
-                                current_mode = "find"
-                                speech_queue.put("Switching to Find mode")
-                                print("System: Switching to Find mode")
-                                command_recognized = True
-                                break
-                            elif "normal mode on" in sub_command:
-                                current_mode = "normal"
-                                speech_queue.put("Switching to Normal mode")
-                                print("System: Switching to Normal mode")
-                                command_recognized = True
-                                break
-                            else:
-                                attempts += 1
-                                if attempts < max_attempts:
-                                    speech_queue.put("I didn't understand. Please try again.")
-                                    print("System: I didn't understand. Please try again.")
-                                    # Delay to ensure system message is spoken and user has time
-                                    time.sleep(1.5)
+                        if "find mode on" in sub_command and target is None:
+                            mode_state.publish(mode="find")
+                            trace.mark("mode switch", mode="find")
+                            trace.reply(speaker, "Switching to Find mode")
+                            print("System: Switching to Find mode")
+                            command_recognized = True
+                            break
+                        elif "normal mode on" in sub_command:
+                            mode_state.publish(mode="normal")
+                            trace.mark("mode switch", mode="normal")
+                            trace.reply(speaker, "Switching to Normal mode")
+                            print("System: Switching to Normal mode")
+                            command_recognized = True
+                            break
+                        elif target is not None:
+                            # "find a chair", or "find mode on, chair" offline: follow that class in Find mode
+                            mode_state.publish(mode="find", target_class=target)
+                            trace.mark("mode switch", mode="find")
+                            trace.reply(speaker, f"Finding {target}")
+                            print(f"System: Finding {target}")
+                            command_recognized = True
+                            break
+                        else:
+                            attempts += 1
+                            if attempts < max_attempts:
+                                trace.reply(speaker, "I didn't understand. Please try again.")
+                                print("System: I didn't understand. Please try again.")
+                                # Delay to ensure system message is spoken and user has time
+                                time.sleep(1.5)
                     except sr.WaitTimeoutError:
                         attempts += 1
                         if attempts < max_attempts:
-                            speech_queue.put("I didn't hear you. Please try again.")
+                            trace.reply(speaker, "I didn't hear you. Please try again.")
                             print("System: I didn't hear you. Please try again.")
                             time.sleep(1.5)
                         continue
                     except sr.UnknownValueError:
                         attempts += 1
                         if attempts < max_attempts:
-                            speech_queue.put("I didn't understand. Please try again.")
+                            trace.reply(speaker, "I didn't understand. Please try again.")
                             print("System: I didn't understand. Please try again.")
                             time.sleep(1.5)
                         continue
@@ -102,7 +165,7 @@ def handle_command(recognizer, audio):
                         print(f"Speech recognition error: {e}")
                         attempts += 1
                         if attempts < max_attempts:
-                            speech_queue.put("I didn't understand. Please try again.")
+                            trace.reply(speaker, "I didn't understand. Please try again.")
                             print("System: I didn't understand. Please try again.")
                             time.sleep(1.5)
                         continue
@@ -110,61 +173,61 @@ def handle_command(recognizer, audio):
                         print(f"Unexpected error in speech recognition: {e}")
                         attempts += 1
                         if attempts < max_attempts:
-                            speech_queue.put("I didn't understand. Please try again.")
+                            trace.reply(speaker, "I didn't understand. Please try again.")
                             print("System: I didn't understand. Please try again.")
                             time.sleep(1.5)
                         continue
 
-            # After attempts or successful command, update audio_status and resume
-            with mode_lock:
-                with audio_lock:
-                    if command_recognized:
-                        # Set audio_status based on the new mode
-                        audio_status = True if current_mode == "normal" else False
-                        print(f"Interaction ended. Audio status set to {audio_status} (Mode: {current_mode})")
-                    else:
-                        # If no command recognized, resume current mode
-                        speech_queue.put("Skipping switching due to unclear command. Continuing in current mode.")
-                        print("System: Skipping switching due to unclear command. Continuing in current mode.")
-                        audio_status = True if current_mode == "normal" else False
-                        print(f"Interaction ended. Audio status set to {audio_status} (Mode: {current_mode})")
-
-            # Resume background listening
-            listening_active = True
+            # After attempts or successful command, set announcements for the mode and resume background listening
+            if not command_recognized:
+                # If no command recognized, resume current mode
+                trace.reply(speaker, "Skipping switching due to unclear command. Continuing in current mode.")
+                print("System: Skipping switching due to unclear command. Continuing in current mode.")
+            # Listen again; object names come back only in Normal mode
+            state = mode_state.update(after_interaction)
+            print(f"Interaction ended. Audio status set to {state.announcements} (Mode: {state.mode})")
         else:
             # Check for direct mode-switching commands
-            with mode_lock:
-                with audio_lock:
-                    if "find mode on" in command:
-                        current_mode = "find"
-                        audio_status = False  # No object names in find mode
-                        print("Switched to Find mode (detect_track.py).")
-                    elif "normal mode on" in command:
-                        current_mode = "normal"
-                        audio_status = True  # Resume object names in normal mode
-                        print("Switched to Normal mode (detect.py).")
+            if "find mode on" in command:
+                mode_state.publish(mode="find", announcements=False)  # No object names in find mode
+                trace.mark("mode switch", mode="find")
+                print("Switched to Find mode (detect_track.py).")
+            elif "normal mode on" in command:
+                mode_state.publish(mode="normal", announcements=True)  # Resume object names in normal mode
+                trace.mark("mode switch", mode="normal")
+                print("Switched to Normal mode (detect.py).")
     except sr.UnknownValueError:
         print("Could not understand the command.")
     except sr.RequestError as e:
         print(f"Speech recognition error: {e}")
     except Exception as e:
         print(f"Unexpected error in speech recognition: {e}")
+    finally:
+        trace.end(mode=mode_state.snapshot.mode)
 
 def listen_for_commands():
     """
     Listens to the microphone in the background and processes voice commands.
     """
-    global running, listening_active
+    # Listening, recognition and the microphone callbacks stay off the inference cores
+    budget.pin_current_thread("audio")
     recognizer = sr.Recognizer()
-    mic = sr.Microphone()
+    mic = open_microphone()
 
     print("Microphone listening started. Say 'Hello system' to interact, or 'Find mode on'/'Normal mode on' to switch modes.")
 
+    # Seed the shared noise estimate once; interactions reuse it without recalibrating
+    with mic as source:
+        noise_floor.calibrate(recognizer, source)
+
     # Start background listening
     stop_listening = recognizer.listen_in_background(mic, handle_command, phrase_time_limit=5)
+    microphone_ready.set()
 
     while running:
-        if not listening_active:
+        # Keep the noise estimate in step with the continuously adapting listener
+        noise_floor.follow(recognizer)
+        if not mode_state.snapshot.listening:
             # Wait until listening is resumed
             time.sleep(0.1)
             continue
@@ -173,88 +236,154 @@ def listen_for_commands():
     # Stop background listening when done
     stop_listening(wait_for_stop=False)
 
-def main_ui():
+def load_detection():
     """
-    Main UI function that streams video, switches between detect.py and detect_track.py based on mode.
+    Imports the detection stack, then loads the model, opens the camera and runs a warm-up inference.
     """
-    global current_mode, running, audio_status
+    global cv2, pipeline
+    with startup.stage("import OpenCV, torch and detection"):
+        import cv2
+        from detector import YoloDetector
+        from pipeline import DetectionPipeline
+        from detection_log import DetectionLog
+        from earcons import EarconPlayer
+        from capability_probe import best_backend, probe
+    with startup.stage("inference backend choice"):
+        # Cached per machine. The first start benchmarks the backends once voice loading is done,
+        # so the timings are not skewed by it competing for the cores
+        backend = best_backend(before_probe=voice_loaded.wait)
+    with startup.stage("model load"):
+        local_detector = lambda: YoloDetector(backend["model"], device=backend["device"])
+        if detection_server:
+            # Remote detector mode: the model runs on the server, locally only while it is unreachable
+            from remote_detector import RemoteDetector
+            detector = RemoteDetector(detection_server, fallback=local_detector)
+        else:
+            try:
+                detector = local_detector()
+            except Exception as e:
+                # The cached choice no longer loads, e.g. its exported model was removed
+                print(f"Inference backend failed to load ({e}), probing again")
+                backend = probe()
+                detector = local_detector()
+        budget.torch_threads = backend["threads"]
+        budget.apply_thread_limits()
+        print(f"CPU budget: {budget.describe()}")
+    with startup.stage("camera and warm-up inference"):
+        # Continuous Find-mode guidance beside the speech queue
+        earcons = simulation.earcons() if simulation is not None else EarconPlayer()
+        earcons.start()
+        source = simulation.video if simulation is not None else video_source
+        pipeline = DetectionPipeline(source=source, detector=detector, speaker=speaker,
+                                     detection_log=DetectionLog(), earcons=earcons)
+        pipeline.start()
+        # The first frame through all stages opens the camera and runs one inference
+        pipeline.next_frame()
 
-    # Video source
-    video_source = 0
-    target_class = "person"  # Default class for detect_track.py
+def load_voice():
+    """
+    Imports speech recognition, creates the recognizer backend and starts the microphone listener.
+    """
+    global sr, noise_floor, vad, SPHINX_SAMPLE_RATE, vocabulary, recognizer_backend, streaming_listener, listener_thread
+    try:
+        with startup.stage("import speech recognition"):
+            import speech_recognition as sr
+            from voice_activity import noise_floor, vad
+            from recognizer_backends import get_backend, SPHINX_SAMPLE_RATE
+            from streaming_recognizer import create_streaming_listener
+            from object_vocabulary import load_vocabulary
+        with startup.stage("object vocabulary and recognizer backend"):
+            vocabulary = load_vocabulary()
+            # The offline backend also spots object names after "find mode on", so a target can be chosen without network
+            recognizer_backend = get_backend(RECOGNIZER, objects=vocabulary.names())
+            streaming_listener = create_streaming_listener(recognizer_backend)
+        with startup.stage("microphone and noise calibration"):
+            listener_thread = threading.Thread(target=listen_for_commands, daemon=True)
+            listener_thread.start()
+            while not microphone_ready.wait(0.1):
+                if not listener_thread.is_alive():
+                    raise RuntimeError("Microphone listener failed to start")
+    finally:
+        voice_loaded.set()
 
-    # Set up window for display
-    window_name = "Blind Navigation - Object Detection"
-    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-    cv2.resizeWindow(window_name, 1280, 720)
+def start_up():
+    """
+    Says "Starting" right away, loads detection and voice in parallel, then says "Ready".
+    """
+    speaker.say("Starting")
+    # The speaker thread renders the fixed system replies while the models and devices load
+    speaker.preload()
+    run_in_parallel(load_detection, load_voice)
+
+    speaker.say("Ready")
+    startup.report()
+    if simulation is not None:
+        simulation.start()
 
-    # Start the microphone listening thread
-    listener_thread = threading.Thread(target=listen_for_commands, daemon=True)
-    listener_thread.start()
+def main_ui():
+    """
+    Main UI function that streams video from the detection pipeline and keeps its mode in step.
+    """
+    global running
 
-    # Variables to manage the detection generators
-    detect_gen = None
-    detect_track_gen = None
+    # Set up window for display
+    window_name = "Blind Navigation - Object Detection"
+    if simulation is None:
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(window_name, 1280, 720)
 
+    # Mode changes arrive as events; the loop never waits for the command handler
+    changes = mode_state.subscribe()
+    state = mode_state.snapshot
     while running:
-        with mode_lock:
-            mode = current_mode
+        if state is not None:
+            # Object names only while announcements are on; Find-mode guidance pauses during interactions
+            pipeline.set_mode(state.mode, state.target_class, announce=state.announce)
+        state = changes.poll()
 
-        # Initialize or switch the generator based on the mode
-        if mode == "normal":
-            if detect_gen is None:
-                detect_gen = run_detection(source=video_source, audio_status_initial=audio_status)
-            try:
-                frame = next(detect_gen)
-            except StopIteration:
-                print("Video stream ended in Normal mode. Restarting...")
-                detect_gen = None
-                continue
-            except Exception as e:
-                print(f"Error in Normal mode: {e}")
-                detect_gen = None
-                continue
-            # Reset detect_track_gen when switching to normal mode
-            detect_track_gen = None
-        else:  # mode == "find"
-            if detect_track_gen is None:
-                detect_track_gen = run_detection_tracking(source=video_source, target_class_input=target_class)
-            try:
-                frame = next(detect_track_gen)
-            except StopIteration:
-                print("Video stream ended in Find mode. Restarting...")
-                detect_track_gen = None
-                continue
-            except Exception as e:
-                print(f"Error in Find mode: {e}")
-                detect_track_gen = None
-                continue
-            # Reset detect_gen when switching to find mode
-            detect_gen = None
+        frame = pipeline.next_frame(timeout=1.0)
+        if frame is None:
+            if pipeline.finished:
+                print("Video stream ended. Restarting...")
+                pipeline.restart()
+            continue
+
+        if simulation is not None:
+            # Headless: nothing to display; stop once the command script has played out
+            if simulation.finished():
+                running = False
+            continue
 
         # Display the frame
         cv2.imshow(window_name, frame)
 
-        # Exit on 'q' key
-        if cv2.waitKey(30) & 0xFF == ord('q'):
+        # Exit on 'q' key; next_frame() blocks until a new frame is ready, so no extra sleep is needed
+        if cv2.waitKey(1) & 0xFF == ord('q'):
             running = False
             break
 
-        # Small sleep to prevent excessive CPU usage
-        time.sleep(0.05)  # Increased sleep to reduce CPU load
+    print("Pipeline stages:")
+    pipeline.report()
+    pipeline.stop()
+    pipeline.earcons.stop()
+    pipeline.detection_log.close()
 
     # Signal the listener thread to stop
     clear_speech_queue()
-    speech_queue.put(None)
+    speaker.close()
 
     # Wait for the listener thread to finish
     listener_thread.join()
 
     # Cleanup
-    cv2.destroyAllWindows()
+    if simulation is not None:
+        simulation.report()
+    else:
+        cv2.destroyAllWindows()
 
 if __name__ == "__main__":
     try:
+        start_up()
         main_ui()
     except KeyboardInterrupt:
         print("Program interrupted by user.")
@@ -262,4 +391,5 @@ if __name__ == "__main__":
         print(f"Unexpected error: {e}")
     finally:
         running = False
-        cv2.destroyAllWindows()
\ No newline at end of file
+        if cv2 is not None and simulation is None:
+            cv2.destroyAllWindows()
\ No newline at end of file
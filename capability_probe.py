@@ -0,0 +1,198 @@
+"""
+Hardware capability probe that picks the fastest inference configuration once per machine.
+
+The probe lists what the machine offers: CPU model and instruction sets
+(AVX2, AVX-512, VNNI, AMX), physical and logical cores, memory, and CUDA or
+Apple GPUs. It then times the detector under every configuration it can
+run:
+
+    device   cpu, cuda:0, mps
+    model    the .pt weights, plus an exported .onnx file or _openvino_model
+             directory next to them, if present
+    threads  torch threads on the CPU, up to the inference cores of the budget;
+             swept for the .pt weights only, since exported models run on
+             their runtime's own thread pool
+
+The fastest configuration is written to CACHE_FILE with a fingerprint of
+the hardware and software. The launchers call best_backend() at startup. It
+returns the cached choice, or probes again on the first start and whenever
+the fingerprint changes (new machine, new torch, new weights). A first-start
+probe waits until voice loading is done, so the two do not compete for the
+cores, and the launchers probe again if the cached choice fails to load.
+
+Usage:
+    python capability_probe.py           # Report, benchmark and update the cache
+    python capability_probe.py --report  # Only list the hardware
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+from cpu_budget import budget
+from detector import MODEL_NAME
+
+CACHE_FILE = os.path.join(".cache", "capability_probe.json")
+BENCH_FRAMES = 10  # Timed inferences per configuration
+WARMUP_FRAMES = 2
+FRAME_SHAPE = (480, 640, 3)  # Typical webcam frame
+
+# Instruction sets that matter for int8 and fp16 inference, as py-cpuinfo names them
+INSTRUCTION_SETS = {
+    "AVX2": ("avx2",),
+    "AVX-512": ("avx512f",),
+    "AVX-512 VNNI": ("avx512_vnni", "avx512vnni"),
+    "AVX-VNNI": ("avx_vnni", "avxvnni"),
+    "AMX": ("amx_int8", "amx_tile"),
+}
+
+
+def probe_hardware():
+    """Accelerators, instruction sets, cores and memory of this machine."""
+    import cpuinfo
+    import psutil
+    import torch
+    import cv2
+    cpu = cpuinfo.get_cpu_info()
+    flags = set(cpu.get("flags", ()))
+    mps = getattr(torch.backends, "mps", None)
+    try:
+        opencv_cuda = cv2.cuda.getCudaEnabledDeviceCount()
+    except (AttributeError, cv2.error):
+        opencv_cuda = 0
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "cpu": cpu.get("brand_raw", platform.processor()),
+        "instruction_sets": [name for name, names in INSTRUCTION_SETS.items() if flags.intersection(names)],
+        "physical_cores": psutil.cpu_count(logical=False) or 0,
+        "logical_cores": psutil.cpu_count(logical=True) or 0,
+        "memory_gb": round(psutil.virtual_memory().total / 2**30, 1),
+        "cuda": torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+        "mps": bool(mps is not None and mps.is_available()),
+        "opencv_cuda_devices": opencv_cuda,
+    }
+
+
+def candidate_backends(hardware, model_name=MODEL_NAME):
+    """Every (model, device, threads) configuration worth timing on this machine."""
+    stem = os.path.splitext(model_name)[0]
+    exported = [path for path in (stem + ".onnx", stem + "_openvino_model") if os.path.exists(path)]
+    cores = len(budget.roles["inference"])
+    thread_counts = sorted({1, max(cores // 2, 1), cores})
+    candidates = [{"model": model_name, "device": "cpu", "threads": threads} for threads in thread_counts]
+    # ONNX Runtime and OpenVINO size their own thread pools, which torch.set_num_threads() does not
+    # touch, so sweeping torch threads would only time the same configuration again
+    candidates += [{"model": model, "device": "cpu", "threads": cores} for model in exported]
+    if hardware["cuda"]:
+        candidates.append({"model": model_name, "device": "cuda:0", "threads": cores})
+    if hardware["mps"]:
+        candidates.append({"model": model_name, "device": "mps", "threads": cores})
+    return candidates
+
+
+def benchmark(backend, frames=BENCH_FRAMES):
+    """Milliseconds per inference of `backend` on a synthetic frame."""
+    import torch
+    from detector import YoloDetector
+    torch.set_num_threads(backend["threads"])
+    detector = YoloDetector(backend["model"], device=backend["device"])
+    frame = np.random.default_rng(0).integers(0, 256, FRAME_SHAPE, dtype=np.uint8)
+    for _ in range(WARMUP_FRAMES):
+        detector.detect(frame)
+    start = time.perf_counter()
+    for _ in range(frames):
+        detector.detect(frame)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def fingerprint(model_name):
+    """
+    What the cached choice depends on; any change triggers a new probe.
+
+    Cheap to compute, unlike probe_hardware(), since it is checked at every start.
+    """
+    import torch
+    weights = os.path.getmtime(model_name) if os.path.exists(model_name) else None
+    return {
+        "machine": [platform.node(), platform.machine(), platform.processor(), os.cpu_count()],
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "cuda": torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+        "model": model_name,
+        "weights_mtime": weights,
+        "inference_cores": budget.roles["inference"],
+    }
+
+
+def probe(model_name=MODEL_NAME, cache_file=CACHE_FILE):
+    """Benchmark every candidate backend, cache the fastest and return it."""
+    hardware = probe_hardware()
+    results = []
+    for backend in candidate_backends(hardware, model_name):
+        try:
+            ms = benchmark(backend)
+        except Exception as e:
+            print(f"  {backend['model']} on {backend['device']} with {backend['threads']} threads: failed ({e})")
+            continue
+        print(f"  {backend['model']} on {backend['device']} with {backend['threads']} threads: {ms:.1f} ms/frame")
+        results.append(dict(backend, ms=round(ms, 2)))
+    if not results:
+        raise RuntimeError("No inference backend could be run")
+    best = min(results, key=lambda r: r["ms"])
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint(model_name), "best": best,
+                   "results": results, "hardware": hardware}, f, indent=2)
+    return best
+
+
+def cached_backend(model_name=MODEL_NAME, cache_file=CACHE_FILE):
+    """The cached choice if it was made for this machine and model, else None."""
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get("fingerprint") != fingerprint(model_name):
+        return None
+    return cache["best"]
+
+
+def best_backend(model_name=MODEL_NAME, cache_file=CACHE_FILE, before_probe=None):
+    """
+    The fastest backend for this machine, probed on first use and cached.
+
+    `before_probe` is called before probing, e.g. to wait until other startup
+    work is done so the benchmark has the cores to itself.
+    """
+    best = cached_backend(model_name, cache_file)
+    if best is None:
+        if before_probe is not None:
+            before_probe()
+        print("Probing inference backends (first start on this machine)...")
+        best = probe(model_name, cache_file)
+    print(f"Inference backend: {best['model']} on {best['device']} with {best['threads']} threads "
+          f"({best['ms']:.1f} ms/frame when probed)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe the hardware and cache the fastest inference backend.")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--report", action="store_true", help="Only print the hardware report")
+    args = parser.parse_args()
+
+    print("Python Version:", sys.version)
+    for key, value in probe_hardware().items():
+        print(f"{key.replace('_', ' ').capitalize()}: {value}")
+    if not args.report:
+        best = probe(args.model)
+        print(f"Fastest: {best['model']} on {best['device']} with {best['threads']} threads, "
+              f"{best['ms']:.1f} ms/frame (cached in {CACHE_FILE})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+CPU core budget for inference and audio.
+
+Torch's intra-op threads, OpenCV's thread pool, the microphone callbacks and the
+text-to-speech engine all run on the same few cores. Left alone, torch and
+OpenCV each start one thread per core, inference oversubscribes the CPU and
+audio misses its deadlines. CoreBudget splits the cores in two:
+
+    inference  the detection loop, torch and OpenCV threads
+    audio      microphone listening, speech recognition and speech output
+
+It sizes the torch and OpenCV thread pools to the inference cores and pins
+threads to their share. Threads inherit their creator's affinity, so pinning
+the main thread before torch starts its pool covers every inference thread,
+and pinning the audio threads before they open a stream covers the PortAudio
+callbacks. Where per-thread affinity is not available only the thread counts
+are applied. `python bench_cpu_budget.py` compares configurations.
+"""
+import os
+
+AUDIO_CORES = 1  # Cores reserved for audio when there are more than this many
+CV2_THREADS = 1  # OpenCV only resizes and draws here; its pool would compete with torch
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def available_cores():
+    """Cores this process may run on, in ascending order."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def set_thread_affinity(cores):
+    """Restrict the calling thread to `cores`; returns False where that is not supported."""
+    if hasattr(os, "sched_setaffinity"):
+        # On Linux pid 0 is the calling thread, not the whole process
+        os.sched_setaffinity(0, cores)
+        return True
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentThread.restype = ctypes.c_void_p
+        kernel32.SetThreadAffinityMask.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        mask = sum(1 << core for core in cores)
+        return bool(kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), mask))
+    return False
+
+
+class CoreBudget:
+    """Splits the available cores between inference and audio work."""
+
+    def __init__(self, cores=None, audio_cores=AUDIO_CORES, torch_threads=None, cv2_threads=CV2_THREADS, pin=True):
+        self.cores = list(cores) if cores is not None else available_cores()
+        if 0 < audio_cores < len(self.cores):
+            self.roles = {"inference": self.cores[:-audio_cores], "audio": self.cores[-audio_cores:]}
+        else:
+            # Too few cores to reserve any: everything shares them
+            self.roles = {"inference": self.cores, "audio": self.cores}
+            pin = False
+        self.torch_threads = torch_threads or len(self.roles["inference"])
+        self.cv2_threads = cv2_threads
+        self.pin = pin
+
+    def configure_environment(self):
+        """Set the thread-pool environment variables; only effective before torch is imported."""
+        for var in THREAD_ENV_VARS:
+            os.environ.setdefault(var, str(self.torch_threads))
+
+    def apply_thread_limits(self):
+        """Size the torch and OpenCV thread pools."""
+        import cv2
+        import torch
+        torch.set_num_threads(self.torch_threads)
+        cv2.setNumThreads(self.cv2_threads)
+
+    def pin_current_thread(self, role):
+        """Pin the calling thread (and the threads it starts later) to the cores of `role`."""
+        if not self.pin:
+            return False
+        try:
+            return set_thread_affinity(self.roles[role])
+        except OSError as e:
+            print(f"Could not pin {role} thread: {e}")
+            return False
+
+    def describe(self):
+        pinning = "pinned" if self.pin else "not pinned"
+        return (f"inference cores {self.roles['inference']}, audio cores {self.roles['audio']} ({pinning}); "
+                f"torch threads {self.torch_threads}, OpenCV threads {self.cv2_threads}")
+
+
+# Shared by the launchers and the audio threads
+budget = CoreBudget()
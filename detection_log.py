@@ -0,0 +1,212 @@
+"""
+Compact on-disk log of what the system saw and what it announced.
+
+Every frame's detections (timestamp, frame number, class id, confidence, box)
+and every announcement, once it starts playing, are appended to preallocated
+NumPy structured arrays backed by memory-mapped .npy files, one stream per
+record type. A file is created at its full size and rolls over to a new one
+when it is full, so recording never reallocates and a crash loses at most
+what the OS has not flushed yet. Unused rows carry an infinite timestamp,
+which keeps the time column sorted and lets the reader binary-search a time
+range in each file without loading it.
+
+Usage:
+    python detection_log.py logs --start "2024-05-01 14:00" --end "2024-05-01 14:05"
+    python detection_log.py logs --announcements --last 60
+"""
+import argparse
+import datetime
+import glob
+import os
+import threading
+import time
+import numpy as np
+
+LOG_DIR = "logs"  # Default directory for the log files
+FILE_BYTES = 8 * 1024 * 1024  # Size of one log file before rolling over
+MAX_FILES = 50  # Oldest files of a stream are deleted beyond this many (None keeps all)
+MESSAGE_LENGTH = 64  # Bytes kept of each announcement
+
+DETECTION_DTYPE = np.dtype([
+    ("time", "f8"),  # Unix time of the frame
+    ("frame", "u4"),  # Frame number since the log was opened
+    ("class_id", "i2"),
+    ("conf", "f4"),
+    ("box", "f4", (4,)),  # x1, y1, x2, y2 in frame pixels
+])
+
+ANNOUNCEMENT_DTYPE = np.dtype([
+    ("time", "f8"),
+    ("class_id", "i2"),  # -1 for system replies that are not about a detection
+    ("message", f"S{MESSAGE_LENGTH}"),
+])
+
+STREAMS = {"detections": DETECTION_DTYPE, "announcements": ANNOUNCEMENT_DTYPE}
+
+
+class _RollingArray:
+    """Append-only records in fixed-size memory-mapped files that roll over when full."""
+
+    def __init__(self, directory, stream, dtype, file_bytes, max_files):
+        self.directory = directory
+        self.stream = stream
+        self.dtype = dtype
+        self.capacity = max(1, file_bytes // dtype.itemsize)
+        self.max_files = max_files
+        self.array = None
+        self.count = 0
+        self.files_opened = 0
+
+    def _open_new(self, timestamp):
+        if self.array is not None:
+            self.array.flush()
+        stamp = datetime.datetime.fromtimestamp(timestamp).strftime("%Y%m%d-%H%M%S-%f")
+        # The sequence number keeps files apart when one frame spills over into the next file
+        path = os.path.join(self.directory, f"{self.stream}-{stamp}-{self.files_opened:05d}.npy")
+        self.files_opened += 1
+        self.array = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(self.capacity,))
+        self.array["time"] = np.inf  # Marks unused rows
+        self.count = 0
+        self._delete_old_files()
+
+    def _delete_old_files(self):
+        if self.max_files is None:
+            return
+        files = stream_files(self.directory, self.stream)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            os.remove(path)
+
+    def append(self, records):
+        """Append a structured array of records, rolling over into new files as needed."""
+        start = 0
+        while start < len(records):
+            if self.array is None or self.count == self.capacity:
+                self._open_new(float(records["time"][start]))
+            n = min(len(records) - start, self.capacity - self.count)
+            self.array[self.count:self.count + n] = records[start:start + n]
+            self.count += n
+            start += n
+
+    def flush(self):
+        if self.array is not None:
+            self.array.flush()
+
+    def close(self):
+        self.flush()
+        self.array = None
+
+
+class DetectionLog:
+    """Records per-frame detections and announcements to rolling memory-mapped files."""
+
+    def __init__(self, directory=LOG_DIR, file_bytes=FILE_BYTES, max_files=MAX_FILES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._streams = {name: _RollingArray(directory, name, dtype, file_bytes, max_files)
+                         for name, dtype in STREAMS.items()}
+        self._lock = threading.Lock()
+        self.frame = 0
+
+    def log_frame(self, boxes, class_ids, confs, timestamp=None):
+        """
+        Record the detections of one frame.
+
+        `boxes` is an (n, 4) array of x1, y1, x2, y2; `class_ids` and `confs` have
+        length n. A frame without detections only advances the frame counter.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        records = np.empty(len(boxes), dtype=DETECTION_DTYPE)
+        records["time"] = timestamp
+        records["class_id"] = class_ids
+        records["conf"] = confs
+        records["box"] = boxes
+        with self._lock:
+            records["frame"] = self.frame
+            self.frame += 1
+            if len(records):
+                self._streams["detections"].append(records)
+
+    def log_announcement(self, message, class_id=-1, timestamp=None):
+        """Record a spoken message."""
+        records = np.empty(1, dtype=ANNOUNCEMENT_DTYPE)
+        records["time"] = time.time() if timestamp is None else timestamp
+        records["class_id"] = class_id
+        records["message"] = message.encode("utf-8")[:MESSAGE_LENGTH]
+        with self._lock:
+            self._streams["announcements"].append(records)
+
+    def flush(self):
+        with self._lock:
+            for stream in self._streams.values():
+                stream.flush()
+
+    def close(self):
+        with self._lock:
+            for stream in self._streams.values():
+                stream.close()
+
+
+def stream_files(directory, stream):
+    """Log files of one stream, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, f"{stream}-*.npy")))
+
+
+def read_range(directory, stream="detections", start=None, end=None):
+    """
+    Records of `stream` with start <= time < end (Unix seconds; None is open-ended).
+
+    Each file is memory-mapped and only the matching rows are copied out.
+    """
+    start = -np.inf if start is None else start
+    end = np.inf if end is None else end
+    parts = []
+    for path in stream_files(directory, stream):
+        records = np.load(path, mmap_mode="r")
+        times = records["time"]
+        if len(times) == 0 or times[0] == np.inf:
+            continue  # Nothing written yet
+        if times[0] >= end:
+            break  # Files are ordered by their first record, so the rest start even later
+        # Unused rows are +inf, so searching for an infinite end stops at the last record
+        lo = np.searchsorted(times, start, side="left")
+        hi = np.searchsorted(times, end, side="left")
+        if hi > lo:
+            parts.append(np.array(records[lo:hi]))
+    if not parts:
+        return np.zeros(0, dtype=STREAMS[stream])
+    return np.concatenate(parts)
+
+
+def parse_time(value):
+    """Unix seconds from a number or an ISO date/time string."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print logged detections or announcements in a time range.")
+    parser.add_argument("directory", nargs="?", default=LOG_DIR)
+    parser.add_argument("--announcements", action="store_true", help="Show announcements instead of detections")
+    parser.add_argument("--start", help="Unix time or ISO date/time")
+    parser.add_argument("--end", help="Unix time or ISO date/time")
+    parser.add_argument("--last", type=float, help="Only the last N seconds")
+    args = parser.parse_args()
+
+    start = parse_time(args.start) if args.start else None
+    end = parse_time(args.end) if args.end else None
+    if args.last:
+        start = time.time() - args.last
+    stream = "announcements" if args.announcements else "detections"
+    records = read_range(args.directory, stream, start, end)
+    for r in records:
+        when = datetime.datetime.fromtimestamp(r["time"]).isoformat(sep=" ", timespec="milliseconds")
+        if args.announcements:
+            print(f"{when}  {r['message'].decode('utf-8', 'replace')}")
+        else:
+            x1, y1, x2, y2 = r["box"]
+            print(f"{when}  frame {r['frame']:6d}  class {r['class_id']:3d}  conf {r['conf']:.2f}  "
+                  f"box {x1:.0f},{y1:.0f},{x2:.0f},{y2:.0f}")
+    print(f"{len(records)} {stream}")
@@ -0,0 +1,192 @@
+"""
+Detection server for clients too slow to run the model themselves.
+
+A phone-class device cannot run YOLO at a usable frame rate, but a laptop in
+a backpack on the same network can. The client (remote_detector.py) sends
+each frame as a JPEG over TCP. The server decodes it, and one worker thread
+batches the frames waiting from all connected clients into a single forward
+pass. The reply is the compact detection array: a count followed by
+x1, y1, x2, y2, confidence, class id as float32 per detection.
+
+Protocol, all integers big-endian:
+    server hello     u32 length, JSON {"names": {class id: name}}
+    request          u32 JPEG length, u16 input size (0 = server default),
+                     u16 class count, class count x u16 class ids (none = all), JPEG
+    reply            u32 detection count, count x 6 little-endian float32
+
+Usage:
+    python detection_server.py --host 0.0.0.0 --port 8765 --model yolov8n.pt
+"""
+import argparse
+import json
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+
+PORT = 8765
+MAX_BATCH = 8  # Frames run in one forward pass at most
+BATCH_WAIT = 0.005  # Seconds the worker waits for more frames once the first has arrived
+
+REQUEST_HEADER = struct.Struct("!IHH")
+COUNT = struct.Struct("!I")
+DETECTION_DTYPE = np.dtype("<f4")
+
+
+def recv_exact(sock, size):
+    """Exactly `size` bytes from `sock`; raises ConnectionError if the peer closes first."""
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("connection closed")
+        received += n
+    return data
+
+
+def send_hello(sock, names):
+    hello = json.dumps({"names": {str(k): v for k, v in names.items()}}).encode()
+    sock.sendall(COUNT.pack(len(hello)) + hello)
+
+
+def recv_hello(sock):
+    (size,) = COUNT.unpack(recv_exact(sock, COUNT.size))
+    names = json.loads(bytes(recv_exact(sock, size)))["names"]
+    return {int(k): v for k, v in names.items()}
+
+
+def send_request(sock, jpeg, imgsz=None, classes=None):
+    classes = list(classes or ())
+    header = REQUEST_HEADER.pack(len(jpeg), imgsz or 0, len(classes)) + struct.pack(f"!{len(classes)}H", *classes)
+    sock.sendall(header + jpeg)
+
+
+def recv_request(sock):
+    """(JPEG bytes, input size or None, class ids or None) of the next request."""
+    size, imgsz, n_classes = REQUEST_HEADER.unpack(recv_exact(sock, REQUEST_HEADER.size))
+    classes = struct.unpack(f"!{n_classes}H", recv_exact(sock, 2 * n_classes)) if n_classes else None
+    return recv_exact(sock, size), imgsz or None, classes
+
+
+def send_detections(sock, detections):
+    sock.sendall(COUNT.pack(len(detections)) + detections.astype(DETECTION_DTYPE, copy=False).tobytes())
+
+
+def recv_detections(sock):
+    (count,) = COUNT.unpack(recv_exact(sock, COUNT.size))
+    data = recv_exact(sock, count * 6 * DETECTION_DTYPE.itemsize)
+    return np.frombuffer(data, dtype=DETECTION_DTYPE).reshape(count, 6).astype(np.float32)
+
+
+class _Request:
+    __slots__ = ("frame", "key", "detections", "done")
+
+    def __init__(self, frame, imgsz, classes):
+        self.frame = frame
+        self.key = (imgsz, classes)  # Only requests with the same settings share a forward pass
+        self.detections = None
+        self.done = threading.Event()
+
+
+class DetectionServer(socketserver.ThreadingTCPServer):
+    """Serves detections to any number of clients, batching their frames."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, detector, host="127.0.0.1", port=PORT, max_batch=MAX_BATCH, batch_wait=BATCH_WAIT):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.frames = 0
+        super().__init__((host, port), _ClientHandler)
+        self.worker = threading.Thread(target=self._batch_worker, name="detection-batches", daemon=True)
+        self.worker.start()
+
+    def detect(self, frame, imgsz=None, classes=None):
+        """Queue `frame` for the next batch and wait for its detections."""
+        request = _Request(frame, imgsz, classes)
+        self.pending.put(request)
+        request.done.wait()
+        return request.detections
+
+    def _batch_worker(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.perf_counter() + self.batch_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.pending.get(timeout=max(deadline - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.key, []).append(request)
+            for (imgsz, classes), requests in groups.items():
+                try:
+                    results = self.detector.detect_batch([r.frame for r in requests], classes=classes, imgsz=imgsz)
+                except Exception as e:
+                    print(f"Detection failed: {e}")
+                    results = [np.zeros((0, 6), dtype=np.float32)] * len(requests)
+                for request, detections in zip(requests, results):
+                    request.detections = detections
+                    request.done.set()
+            self.batches += 1
+            self.frames += len(batch)
+
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        print(f"Client connected: {self.client_address}")
+        send_hello(sock, self.server.detector.names)
+        try:
+            while True:
+                jpeg, imgsz, classes = recv_request(sock)
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    detections = np.zeros((0, 6), dtype=np.float32)
+                else:
+                    detections = self.server.detect(frame, imgsz, classes)
+                send_detections(sock, detections)
+        except (ConnectionError, OSError):
+            pass
+        print(f"Client disconnected: {self.client_address}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve object detections to remote clients.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (0.0.0.0 for all)")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--model", default=None, help="Weights to load (default: the detector's default)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--batch-wait-ms", type=float, default=BATCH_WAIT * 1000)
+    args = parser.parse_args()
+
+    from detector import YoloDetector
+    detector = YoloDetector(args.model) if args.model else YoloDetector()
+    detector.detect(np.zeros((detector.imgsz, detector.imgsz, 3), dtype=np.uint8))  # Warm up before clients time out
+    server = DetectionServer(detector, args.host, args.port, args.max_batch, args.batch_wait_ms / 1000)
+    print(f"Detection server listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if server.batches:
+            print(f"{server.frames} frames in {server.batches} batches "
+                  f"({server.frames / server.batches:.1f} frames per batch)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+YOLOv8 object detector returning compact NumPy detections, plus drawing helpers.
+
+Detections are an (n, 6) float32 array of x1, y1, x2, y2, confidence, class id
+in frame pixels, so the pipeline stages pass plain arrays around instead of
+Ultralytics result objects.
+"""
+import cv2
+import numpy as np
+
+MODEL_NAME = "yolov8n.pt"  # Small enough for real-time inference on CPU
+CONFIDENCE_THRESHOLD = 0.5  # Detections below this confidence are discarded
+IMG_SIZE = 640  # Model input size
+
+BOX_COLOR = (0, 200, 0)
+TARGET_COLOR = (0, 0, 255)
+
+
+class YoloDetector:
+    """Runs a YOLOv8 model on BGR frames."""
+
+    def __init__(self, model_name=MODEL_NAME, conf=CONFIDENCE_THRESHOLD, imgsz=IMG_SIZE, device=None):
+        from ultralytics import YOLO
+        self.model = YOLO(model_name)
+        self.names = self.model.names  # {class id: class name}
+        self._ids = {name: i for i, name in self.names.items()}
+        self.conf = conf
+        self.imgsz = imgsz
+        self.device = device
+
+    def class_id(self, name):
+        """Class id of `name`, or None if the model does not know it."""
+        return self._ids.get(name)
+
+    def detect(self, frame, classes=None, imgsz=None):
+        """Detect objects in `frame`; `classes` optionally restricts the class ids."""
+        return self.detect_batch([frame], classes, imgsz)[0]
+
+    def detect_batch(self, frames, classes=None, imgsz=None):
+        """Detections of several frames in one forward pass, one array per frame."""
+        results = self.model(list(frames), conf=self.conf, imgsz=imgsz or self.imgsz, classes=classes,
+                             device=self.device, verbose=False)
+        return [r.boxes.data.cpu().numpy()[:, :6].astype(np.float32, copy=False) for r in results]
+
+
+def draw_detections(frame, detections, names, highlight=None):
+    """Draw labelled boxes on `frame` in place; boxes of class `highlight` stand out."""
+    for x1, y1, x2, y2, conf, cls in detections:
+        name = names[int(cls)]
+        color = TARGET_COLOR if name == highlight else BOX_COLOR
+        p1, p2 = (int(x1), int(y1)), (int(x2), int(y2))
+        cv2.rectangle(frame, p1, p2, color, 2)
+        cv2.putText(frame, f"{name} {conf:.2f}", (p1[0], max(p1[1] - 5, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+    return frame
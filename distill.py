@@ -0,0 +1,183 @@
+"""
+Knowledge distillation from a large teacher (yolov8l) into a nano or small student.
+
+test.py deploys yolov8l.pt for its accuracy, but only the nano model keeps up
+on a CPU. Here the large model teaches the small one through its detections.
+The teacher runs once over every training image; its confident detections of
+the dataset's classes that no ground-truth box already covers become extra
+training labels for the student. The student learns the objects the
+annotators missed, and the teacher's view of ambiguous ones, at no extra
+cost per epoch.
+
+Teacher outputs are cached in a .npz next to the training images, keyed by
+the teacher weights, input size and confidence threshold. Every later run and
+every epoch reads the cache instead of running the teacher. Because the
+teacher's boxes are labels, mosaic, flips and scaling transform them exactly
+like the annotations.
+
+The teacher maps to the dataset's classes by name. A COCO yolov8l.pt teaches
+the classes the two share (chair, couch, bed, tv, ...). A yolov8l fine-tuned
+on the dataset with train.py teaches all of them.
+
+Usage:
+    python train.py --data data.yaml --model yolov8n.pt --teacher yolov8l.pt
+    python distill.py --data data.yaml --teacher yolov8l.pt   # Only fill the cache
+"""
+import argparse
+import os
+import cv2
+import numpy as np
+from tracker import iou_matrix
+
+TEACHER_MODEL = "yolov8l.pt"
+TEACHER_CONF = 0.5  # Teacher detections below this confidence are not used as labels
+OVERLAP_IOU = 0.5  # A teacher box overlapping a ground-truth box of its class this much adds nothing
+TEACHER_BATCH = 8  # Images per teacher forward pass
+
+
+def cache_path(img_path, teacher, imgsz):
+    """Where the teacher's outputs for the split at `img_path` are cached."""
+    first = img_path[0] if isinstance(img_path, (list, tuple)) else img_path
+    directory = first if os.path.isdir(first) else os.path.dirname(first)
+    stem = os.path.splitext(os.path.basename(teacher.rstrip("/\\")))[0]
+    return os.path.join(directory, f"teacher_{stem}_{imgsz}.npz")
+
+
+def _resolve_teacher(teacher):
+    """Local path of the teacher weights, downloading released weights such as yolov8l.pt first."""
+    if os.path.exists(teacher):
+        return teacher
+    from ultralytics.utils.downloads import attempt_download_asset
+    path = str(attempt_download_asset(teacher))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Teacher weights {teacher} not found and could not be downloaded")
+    return path
+
+
+def _cache_key(teacher, imgsz, conf, im_files):
+    # `teacher` is a resolved local path, so the key always holds the real weights' mtime
+    mtime = os.path.getmtime(teacher)
+    return np.array([os.path.abspath(teacher), str(mtime), str(imgsz), str(conf), str(len(im_files))])
+
+
+def teacher_outputs(dataset, teacher, conf=TEACHER_CONF, device=None):
+    """
+    The teacher's detections of every image in `dataset`, computed once and cached.
+
+    Returns (rows, offsets, names): rows are normalized x, y, w, h, confidence
+    and teacher class id, image i owns rows[offsets[i]:offsets[i + 1]].
+    """
+    path = cache_path(dataset.img_path, teacher, dataset.imgsz)
+    teacher = _resolve_teacher(teacher)
+    key = _cache_key(teacher, dataset.imgsz, conf, dataset.im_files)
+    if os.path.exists(path):
+        cached = np.load(path)
+        if np.array_equal(cached["key"], key) and np.array_equal(cached["files"], np.array(dataset.im_files)):
+            names = dict(zip(cached["name_ids"].tolist(), cached["names"].tolist()))
+            return cached["rows"], cached["offsets"], names
+        print(f"Teacher cache {path} is out of date, recomputing")
+
+    from detector import YoloDetector
+    model = YoloDetector(teacher, conf=conf, imgsz=dataset.imgsz, device=device)
+    # Memory-mapped datasets hold the letterboxed images their labels refer to
+    images = getattr(dataset, "images", None)
+    rows, offsets = [], [0]
+    count = len(dataset.im_files)
+    print(f"Running teacher {teacher} over {count} images (cached in {path})")
+    for start in range(0, count, TEACHER_BATCH):
+        indices = range(start, min(start + TEACHER_BATCH, count))
+        frames = [images[i] if images is not None else cv2.imread(dataset.im_files[i], cv2.IMREAD_COLOR)
+                  for i in indices]
+        for frame, detections in zip(frames, model.detect_batch(frames)):
+            h, w = frame.shape[:2]
+            x1, y1, x2, y2, score, cls = detections.T
+            rows.append(np.stack([(x1 + x2) / 2 / w, (y1 + y2) / 2 / h, (x2 - x1) / w, (y2 - y1) / h, score, cls],
+                                 axis=1).astype(np.float32))
+            offsets.append(offsets[-1] + len(detections))
+
+    rows = np.concatenate(rows) if rows else np.zeros((0, 6), dtype=np.float32)
+    offsets = np.array(offsets, dtype=np.int64)
+    np.savez(path, key=key, files=np.array(dataset.im_files), rows=rows, offsets=offsets,
+             name_ids=np.array(list(model.names.keys())), names=np.array(list(model.names.values())))
+    return rows, offsets, model.names
+
+
+def add_teacher_labels(dataset, rows, offsets, teacher_names, class_names):
+    """Append the teacher's boxes to the labels of `dataset` where they add an object; returns how many."""
+    by_name = {name.lower(): i for i, name in class_names.items()}
+    mapping = {t: by_name[name.lower()] for t, name in teacher_names.items() if name.lower() in by_name}
+    if not mapping:
+        print("The teacher knows none of the dataset's classes; training without teacher labels")
+        return 0
+    lookup = np.full(max(teacher_names) + 1, -1, dtype=np.int64)
+    lookup[list(mapping)] = list(mapping.values())
+
+    added = 0
+    for i, label in enumerate(dataset.labels):
+        teacher = rows[offsets[i]:offsets[i + 1]]
+        cls = lookup[teacher[:, 5].astype(np.int64)]
+        teacher = teacher[cls >= 0]
+        cls = cls[cls >= 0]
+        if len(teacher) == 0:
+            continue
+        boxes = label["bboxes"]
+        truth_cls = label["cls"].reshape(-1)
+        if len(boxes):
+            # Ground truth wins: drop teacher boxes that duplicate an annotated object
+            iou = iou_matrix(_xyxy(teacher[:, :4]), _xyxy(boxes))
+            iou[cls[:, None] != truth_cls[None, :]] = 0
+            keep = iou.max(axis=1) < OVERLAP_IOU
+            teacher, cls = teacher[keep], cls[keep]
+        if dataset.single_cls:
+            cls = np.zeros_like(cls)
+        label["bboxes"] = np.concatenate([boxes, teacher[:, :4]]).astype(np.float32)
+        label["cls"] = np.concatenate([label["cls"], cls[:, None].astype(np.float32)])
+        added += len(teacher)
+    return added
+
+
+def _xyxy(xywh):
+    return np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+
+
+def distillation_trainer(base, teacher=TEACHER_MODEL, conf=TEACHER_CONF, device=None):
+    """Subclass of the trainer class `base` whose training split includes the teacher's labels."""
+
+    class DistillationTrainer(base):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            dataset = super().build_dataset(img_path, mode, batch)
+            if mode == "train":
+                rows, offsets, teacher_names = teacher_outputs(dataset, teacher, conf, device)
+                added = add_teacher_labels(dataset, rows, offsets, teacher_names, self.data["names"])
+                print(f"Distillation: {added} teacher boxes added to {len(dataset.labels)} training images")
+            return dataset
+
+    return DistillationTrainer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute and cache teacher outputs for distillation.")
+    parser.add_argument("--data", required=True, help="Dataset data.yaml (original or from mmap_dataset.py)")
+    parser.add_argument("--teacher", default=TEACHER_MODEL)
+    parser.add_argument("--conf", type=float, default=TEACHER_CONF)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--device", default=None)
+    args = parser.parse_args()
+
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data import build_yolo_dataset
+    from ultralytics.data.utils import check_det_dataset
+    from mmap_dataset import MemmapYOLODataset, is_memmap_dataset
+
+    data = check_det_dataset(args.data)
+    cfg = get_cfg(overrides={"imgsz": args.imgsz, "data": args.data})
+    if is_memmap_dataset(args.data):
+        dataset = MemmapYOLODataset(img_path=data["train"], imgsz=args.imgsz, augment=False, hyp=cfg, data=data)
+    else:
+        dataset = build_yolo_dataset(cfg, data["train"], 16, data, mode="val")
+    rows, offsets, _ = teacher_outputs(dataset, args.teacher, args.conf, args.device)
+    print(f"{len(rows)} teacher detections over {len(offsets) - 1} images")
+
+
+if __name__ == "__main__":
+    main()
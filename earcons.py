@@ -0,0 +1,134 @@
+"""
+Spatial earcons: short tones that say where the Find-mode target is and how close.
+
+Saying "Chair on your left" takes about a second and can only be repeated so
+often; a tone takes a tenth of that. EarconBank renders every tone once at
+startup in NumPy: a stereo beep panned left, centre or right by the target's
+direction and pitched higher the closer its distance band. EarconPlayer mixes
+them into a low-latency sounddevice output stream from the stream's callback
+and repeats the current target's tone like a parking sensor, faster as the
+target gets closer, so guidance is continuous without going through the
+speech queue.
+
+    player = EarconPlayer()
+    player.start()
+    player.set_target("on your left", "near")
+    player.set_target(None)  # Silence
+"""
+import threading
+import time
+import numpy as np
+from cpu_budget import budget
+
+SAMPLE_RATE = 22050
+BEEP_SECONDS = 0.06
+VOLUME = 0.4
+PAN = {"on your left": -1.0, "ahead": 0.0, "on your right": 1.0}
+# Distance band -> (tone frequency in Hz, seconds between beeps)
+BANDS = {"far": (440.0, 0.6), "mid": (660.0, 0.35), "near": (990.0, 0.18)}
+NEAR_AREA = 0.1  # Fraction of the frame a target box covers from which it is "near"
+MID_AREA = 0.02  # ... and "mid"; smaller boxes are "far"
+BLOCK_SIZE = 256  # Samples per callback, about 12 ms
+
+
+def distance_band(area_fraction):
+    """'near', 'mid' or 'far' from the fraction of the frame the target's box covers."""
+    if area_fraction >= NEAR_AREA:
+        return "near"
+    if area_fraction >= MID_AREA:
+        return "mid"
+    return "far"
+
+
+class EarconBank:
+    """Every (direction, band) tone as a float32 (samples, 2) stereo array."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, beep_seconds=BEEP_SECONDS, volume=VOLUME):
+        self.sample_rate = sample_rate
+        t = np.arange(int(sample_rate * beep_seconds)) / sample_rate
+        envelope = np.sin(np.pi * t / t[-1]) ** 2  # Smooth onset and release, no clicks
+        self.tones = {}
+        for direction, pan in PAN.items():
+            # Equal-power panning keeps the loudness the same in every direction
+            angle = (pan + 1) * np.pi / 4
+            gains = np.array([np.cos(angle), np.sin(angle)], dtype=np.float32)
+            for band, (frequency, _) in BANDS.items():
+                mono = (volume * envelope * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+                self.tones[direction, band] = mono[:, None] * gains[None, :]
+
+    def __getitem__(self, key):
+        return self.tones[key]
+
+
+class EarconPlayer:
+    """Mixes earcons into a low-latency output stream and repeats the current target's tone."""
+
+    def __init__(self, bank=None, block_size=BLOCK_SIZE):
+        self.bank = bank or EarconBank()
+        self.block_size = block_size
+        self.target = None  # (direction, band) repeated from the callback, or None
+        self._voices = []  # [tone, position] being mixed
+        self._lock = threading.Lock()
+        self._until_next = 0  # Samples until the target's next beep
+        self._muted_until = 0.0  # perf_counter() time until which the output is silent
+        self.stream = None
+
+    def start(self):
+        """Open the output stream from an audio-pinned thread, whose affinity the callback thread inherits."""
+        thread = threading.Thread(target=self._open_on_audio_cores, name="earcons-start", daemon=True)
+        thread.start()
+        thread.join()
+
+    def _open_on_audio_cores(self):
+        import sounddevice as sd
+        budget.pin_current_thread("audio")
+        self.stream = sd.OutputStream(samplerate=self.bank.sample_rate, channels=2, dtype="float32",
+                                      blocksize=self.block_size, latency="low", callback=self._callback)
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def set_target(self, direction, band=None):
+        """Repeat the tone for `direction` and `band` from now on; None stops the guidance."""
+        target = (direction, band) if direction is not None else None
+        with self._lock:
+            if target is not None and self.target is None:
+                self._until_next = 0  # Sound at once when a target is found
+            self.target = target
+
+    def guide(self, direction, area_fraction):
+        """set_target() with the band of a target box covering `area_fraction` of the frame."""
+        self.set_target(direction, distance_band(area_fraction))
+
+    def mute(self, seconds):
+        """Silence the output for `seconds`, e.g. while an obstacle alert plays; guidance resumes after."""
+        with self._lock:
+            self._voices = []
+            self._muted_until = max(self._muted_until, time.perf_counter() + seconds)
+
+    def play(self, direction, band):
+        """Mix one tone in on top of whatever is playing."""
+        with self._lock:
+            self._voices.append([self.bank[direction, band], 0])
+
+    def _callback(self, outdata, frames, time_info, status):
+        outdata.fill(0)
+        with self._lock:
+            if self.target is not None:
+                self._until_next -= frames
+                if self._until_next <= 0:
+                    self._voices.append([self.bank[self.target], 0])
+                    self._until_next += int(BANDS[self.target[1]][1] * self.bank.sample_rate)
+            if time.perf_counter() < self._muted_until:
+                self._voices = []
+            for voice in self._voices:
+                tone, position = voice
+                chunk = tone[position:position + frames]
+                outdata[:len(chunk)] += chunk
+                voice[1] += len(chunk)
+            self._voices = [v for v in self._voices if v[1] < len(v[0])]
+        np.clip(outdata, -1.0, 1.0, out=outdata)
@@ -0,0 +1,178 @@
+"""
+Video-file source with decode-ahead, frame-accurate seeking, looping and max-speed replay.
+
+FileSource has the cv2.VideoCapture interface the pipeline already uses
+(read(), get(), set(), isOpened(), release()), so a recorded walk can stand in
+for the camera:
+
+- a background thread decodes a few frames ahead into a ring of reused buffers,
+  so decoding overlaps with inference;
+- set(cv2.CAP_PROP_POS_FRAMES, n) lands exactly on frame n, even where the
+  container's own seek stops at a keyframe;
+- at the end of the clip it starts over from frame 0 without the consumer
+  noticing, instead of ending the stream and forcing a restart;
+- with realtime=True frames are released at the clip's frame rate like a live
+  camera; with realtime=False they come as fast as they can be decoded.
+"""
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+DECODE_AHEAD = 8  # Frames decoded ahead of the consumer
+DEFAULT_FPS = 30.0  # Used when the container does not report a frame rate
+SYNTHETIC_SOURCE = "synthetic"  # Source name of the generated scene in sim_devices.py
+
+
+class FileSource:
+    """Decode-ahead reader for a video file."""
+
+    def __init__(self, path, loop=True, realtime=True, decode_ahead=DECODE_AHEAD):
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self.capture = cv2.VideoCapture(path)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.loops = 0  # Times the clip wrapped around
+        self.position = 0  # Index of the frame the next read() returns
+
+        self._ready = []  # (generation, frame index, buffer) waiting to be read
+        self._free = []  # Buffers to decode into
+        self._decode_ahead = decode_ahead
+        self._cond = threading.Condition()
+        self._generation = 0  # Bumped by every seek, so frames decoded before it are discarded
+        self._seek_to = None
+        self._running = self.capture.isOpened()
+        self._pace_start = None  # (wall time, frame index) real-time pacing is measured from
+        self._last_index = -1
+        self._thread = threading.Thread(target=self._decode, name="file-decode", daemon=True)
+        if self._running:
+            self._thread.start()
+
+    def isOpened(self):
+        return self._running or bool(self._ready)
+
+    def _seek(self, index):
+        """Position the decoder exactly on `index`."""
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        if int(self.capture.get(cv2.CAP_PROP_POS_FRAMES)) != index:
+            # The container seeked to a keyframe instead; decode forward from the start
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            for _ in range(index):
+                if not self.capture.grab():
+                    break
+
+    def _decode(self):
+        index = 0
+        buffer = None
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running or self._seek_to is not None
+                                    or len(self._ready) < self._decode_ahead)
+                if not self._running:
+                    return
+                generation = self._generation
+                if self._seek_to is not None:
+                    index, self._seek_to = self._seek_to, None
+                    self._seek(index)
+                if buffer is None and self._free:
+                    buffer = self._free.pop()
+
+            ok, frame = self.capture.read(buffer)
+            if not ok:
+                if self.loop and index > 0:
+                    self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    index = 0
+                    self.loops += 1
+                    continue
+                with self._cond:
+                    self._running = False
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                if generation == self._generation:
+                    self._ready.append((generation, index, frame))
+                    buffer = None
+                    self._cond.notify_all()
+                else:
+                    buffer = frame  # Decoded before a seek; decode into it again
+            index += 1
+
+    def read(self, image=None):
+        """Next frame as (ok, frame), copied into `image` if it has the right shape."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._ready or not self._running)
+            if not self._ready:
+                return False, None
+            _, index, frame = self._ready.pop(0)
+            self._cond.notify_all()
+
+        if self.realtime:
+            self._pace(index)
+        self.position = index + 1
+
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            with self._cond:
+                self._free.append(frame)  # The decode buffer goes back to the ring
+            return True, image
+        return True, frame
+
+    def _pace(self, index):
+        now = time.perf_counter()
+        last, self._last_index = self._last_index, index
+        if self._pace_start is None or index <= last:
+            self._pace_start = (now, index)  # First frame, after a loop or after seeking back
+            return
+        due = self._pace_start[0] + (index - self._pace_start[1]) / self.fps
+        if due > now:
+            time.sleep(due - now)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_count)
+        return self.capture.get(prop)
+
+    def set(self, prop, value):
+        """Only frame positions can be set; the next read() returns frame `value`."""
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        with self._cond:
+            self._generation += 1
+            self._seek_to = int(value)
+            self._free.extend(frame for _, _, frame in self._ready)
+            self._ready.clear()
+            self._pace_start = None
+            self._cond.notify_all()
+        self.position = int(value)
+        return True
+
+    def release(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.capture.release()
+
+
+def is_file_source(source):
+    return isinstance(source, str) and os.path.isfile(source)
+
+
+def open_source(source, loop=True, realtime=True):
+    """A FileSource for video files, the generated scene for "synthetic", a cv2.VideoCapture for cameras and streams."""
+    if hasattr(source, "read"):
+        return source  # Already opened, e.g. a FileSource with its own settings
+    if is_file_source(source):
+        return FileSource(source, loop=loop, realtime=realtime)
+    if source == SYNTHETIC_SOURCE:
+        from sim_devices import SyntheticScene
+        return SyntheticScene(realtime=realtime)
+    return cv2.VideoCapture(source)
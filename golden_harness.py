@@ -0,0 +1,268 @@
+"""
+Golden-output regression harness for faster detection backends and modes.
+
+A speed optimization (ONNX export, quantized weights, a smaller input size,
+skipping frames) is only worth having if the user still hears the same
+things. This harness runs recorded clips through the reference PyTorch model
+once and stores what it detected on every frame and the announcements the
+tracker made from it. Any other model file, input size or frame skip is then
+run over the same clips and scored against that golden output:
+
+    mAP50, mAP50-95  box agreement, the golden detections taken as ground truth
+    announcements    golden announcements missed, extra ones made, and the
+                     frame shift of the ones both made
+    speedup          golden seconds per frame / candidate seconds per frame
+
+Clips are replayed through the same DetectionPipeline the launchers run, so
+tracking, time to collision, obstacle alerts and announcements are all part
+of the score; with --find the clip is replayed in Find mode, which adds ROI
+refinement and guidance. The pipeline runs at maximum speed without dropping
+frames and in clip time rather than wall time, so Normal-mode runs are
+repeatable. In Find mode the refinement hint comes from a frame or two back
+depending on stage timing, so expect small differences between runs. Timings
+are only comparable between runs on the same machine.
+
+Usage:
+    python golden_harness.py record Source/*.mp4 --model yolov8l.pt
+    python golden_harness.py score Source/*.mp4 --model yolov8n.onnx --imgsz 480 --skip 2
+    python golden_harness.py record Source/*.mp4 --find chair
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import os
+import numpy as np
+from detector import MODEL_NAME, YoloDetector
+from file_source import FileSource
+from pipeline import DetectionPipeline
+from tracker import iou_matrix
+
+GOLDEN_DIR = "golden"  # Where golden outputs are stored, one .npz per clip
+REFERENCE_MODEL = "yolov8l.pt"  # The most accurate model, the one test.py deploys
+MATCH_IOU = 0.5  # IoU at which a candidate box matches a golden box for mAP50
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)  # For mAP50-95
+
+
+class GoldenLog:
+    """DetectionLog stand-in that keeps every frame's detections and what was said on it."""
+
+    def __init__(self):
+        self.detections = []
+        self.announcements = []  # (frame index, message)
+
+    def log_frame(self, boxes, class_ids, confs, timestamp=None):
+        self.detections.append(np.column_stack([boxes, confs, class_ids]).astype(np.float32))
+
+    def log_announcement(self, message, class_id=-1, timestamp=None):
+        # Postprocess logs a frame's announcements right after the frame itself
+        self.announcements.append((len(self.detections) - 1, message))
+
+
+class SilentSpeaker:
+    """The pipeline only announces when it has a speaker; this one "says" everything at once, silently."""
+
+    def say(self, text, expires=None, on_start=None):
+        if on_start is not None:
+            on_start()
+
+    def alert(self, sound, text=None, expires=None, on_start=None):
+        self.say(text, expires, on_start)
+
+
+class FrameSkipper:
+    """Runs the detector on every skip-th frame only; the frames in between reuse its detections."""
+
+    def __init__(self, detector, skip):
+        self.detector = detector
+        self.skip = skip
+        self.names = detector.names
+        self._frames = 0
+        self._last = None
+
+    def class_id(self, name):
+        return self.detector.class_id(name)
+
+    def detect(self, frame, **kwargs):
+        if "classes" in kwargs:
+            return self.detector.detect(frame, **kwargs)  # Find-mode close-up of the target
+        if self._frames % self.skip == 0:
+            self._last = self.detector.detect(frame, **kwargs)
+        self._frames += 1
+        return self._last
+
+
+def run_clip(path, detector, skip=1, max_frames=None, target=None):
+    """
+    Detections and announcements of `detector` over the clip at `path`.
+
+    With skip > 1 the model only runs on every skip-th frame and the frames in
+    between reuse its detections, the way a frame-skipping mode would. With a
+    `target` class the clip is replayed in Find mode.
+    Returns a dict with "detections" (one (n, 6) array per frame),
+    "announcements" ((frame index, message) pairs) and "seconds".
+    """
+    source = FileSource(path, loop=False, realtime=False)
+    log = GoldenLog()
+    # Clip time rather than wall time, so time to collision and repeat intervals are the same at any replay speed
+    pipeline = DetectionPipeline(source=source, detector=FrameSkipper(detector, skip) if skip > 1 else detector,
+                                 speaker=SilentSpeaker(), detection_log=log, realtime=False,
+                                 frame_time=lambda index: index / source.fps)
+    if target is not None:
+        pipeline.set_mode("find", target_class=target)
+    frames = 0
+    with contextlib.redirect_stdout(io.StringIO()):  # The pipeline prints every announcement
+        pipeline.start()
+        while (max_frames is None or frames < max_frames) and pipeline.next_frame() is not None:
+            frames += 1
+        pipeline.stop()
+    # Processing time per frame, without decoding, over the frames kept
+    seconds = frames * sum(pipeline.stats[name].total / max(pipeline.stats[name].count, 1)
+                           for name in ("infer", "postprocess"))
+    spoken = [(index, message) for index, message in log.announcements if index < frames]
+    return {"detections": log.detections[:frames], "announcements": spoken, "seconds": seconds}
+
+
+def golden_path(clip, directory=GOLDEN_DIR):
+    return os.path.join(directory, os.path.splitext(os.path.basename(clip))[0] + ".npz")
+
+
+def save_golden(path, run, model_name):
+    """Store a run as flat arrays: detections with their frame index prepended."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rows = [np.column_stack([np.full(len(d), i, dtype=np.float32), d])
+            for i, d in enumerate(run["detections"])]
+    np.savez_compressed(
+        path,
+        detections=np.concatenate(rows) if rows else np.zeros((0, 7), dtype=np.float32),
+        frames=len(run["detections"]),
+        announcement_frames=np.array([i for i, _ in run["announcements"]], dtype=np.int64),
+        announcement_messages=np.array([m for _, m in run["announcements"]], dtype=str),
+        seconds=run["seconds"],
+        model=model_name,
+    )
+
+
+def load_golden(path):
+    data = np.load(path)
+    rows = data["detections"]
+    frames = int(data["frames"])
+    detections = [rows[rows[:, 0] == i, 1:] for i in range(frames)]
+    spoken = list(zip(data["announcement_frames"].tolist(), data["announcement_messages"].tolist()))
+    return {"detections": detections, "announcements": spoken, "seconds": float(data["seconds"]),
+            "model": str(data["model"])}
+
+
+def average_precision(golden, candidate, iou_threshold=MATCH_IOU):
+    """
+    Mean over classes of the area under the precision-recall curve.
+
+    `golden` and `candidate` are per-frame (n, 6) detection arrays. Candidate
+    boxes are matched greedily by descending confidence to unmatched golden
+    boxes of the same class and frame. Classes only the candidate reports
+    score zero.
+    """
+    candidate = candidate[:len(golden)]
+    classes = np.unique(np.concatenate([d[:, 5] for d in golden + candidate] + [np.zeros(0, np.float32)]))
+    aps = []
+    for cls in classes:
+        truths = [g[g[:, 5] == cls, :4] for g in golden]
+        total = sum(len(t) for t in truths)
+        if total == 0:
+            aps.append(0.0)  # A class the reference never saw
+            continue
+        # (confidence, frame, box) of every candidate of this class
+        scored = [(c[4], i, c[:4]) for i, d in enumerate(candidate) for c in d[d[:, 5] == cls]]
+        scored.sort(key=lambda s: -s[0])
+        matched = [np.zeros(len(t), dtype=bool) for t in truths]
+        hits = np.zeros(len(scored), dtype=bool)
+        for k, (_, i, box) in enumerate(scored):
+            if len(truths[i]) == 0:
+                continue
+            ious = iou_matrix(box[None], truths[i])[0]
+            ious[matched[i]] = -1.0
+            best = ious.argmax()
+            if ious[best] >= iou_threshold:
+                matched[i][best] = True
+                hits[k] = True
+        tp = np.cumsum(hits)
+        recall = np.concatenate([[0.0], tp / total, [1.0]])
+        precision = np.concatenate([[1.0], tp / np.arange(1, len(hits) + 1), [0.0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]  # Monotone envelope
+        steps = np.flatnonzero(recall[1:] != recall[:-1])
+        aps.append(float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1])))
+    return float(np.mean(aps)) if aps else 1.0
+
+
+def announcement_diff(golden, candidate):
+    """Golden announcements missed, extra candidate announcements and frame shifts of the shared ones."""
+    matcher = difflib.SequenceMatcher(a=[m for _, m in golden], b=[m for _, m in candidate], autojunk=False)
+    missed, extra, shifts = [], [], []
+    for op, a1, a2, b1, b2 in matcher.get_opcodes():
+        if op == "equal":
+            shifts.extend(candidate[b][0] - golden[a][0] for a, b in zip(range(a1, a2), range(b1, b2)))
+        else:
+            missed.extend(golden[a1:a2])
+            extra.extend(candidate[b1:b2])
+    return missed, extra, shifts
+
+
+def score(golden, candidate):
+    map50 = average_precision(golden["detections"], candidate["detections"])
+    map50_95 = float(np.mean([average_precision(golden["detections"], candidate["detections"], t)
+                              for t in IOU_THRESHOLDS]))
+    missed, extra, shifts = announcement_diff(golden["announcements"], candidate["announcements"])
+    golden_rate = golden["seconds"] / max(len(golden["detections"]), 1)
+    candidate_rate = candidate["seconds"] / max(len(candidate["detections"]), 1)
+    return {
+        "map50": map50,
+        "map50_95": map50_95,
+        "missed": missed,
+        "extra": extra,
+        "mean_shift": float(np.mean(np.abs(shifts))) if shifts else 0.0,
+        "speedup": golden_rate / candidate_rate if candidate_rate else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record golden detections or score a backend against them.")
+    parser.add_argument("command", choices=("record", "score"))
+    parser.add_argument("clips", nargs="+", help="Recorded video clips")
+    parser.add_argument("--model", default=None, help=f"Weights to run (record defaults to {REFERENCE_MODEL})")
+    parser.add_argument("--imgsz", type=int, default=640, help="Model input size")
+    parser.add_argument("--skip", type=int, default=1, help="Run the model on every n-th frame only")
+    parser.add_argument("--find", default=None, metavar="CLASS", help="Replay in Find mode with this target")
+    parser.add_argument("--golden-dir", default=GOLDEN_DIR)
+    parser.add_argument("--max-frames", type=int, default=None)
+    args = parser.parse_args()
+
+    model_name = args.model or (REFERENCE_MODEL if args.command == "record" else MODEL_NAME)
+    detector = YoloDetector(model_name, imgsz=args.imgsz)
+
+    for clip in args.clips:
+        path = golden_path(clip, args.golden_dir)
+        if args.command == "record":
+            run = run_clip(clip, detector, max_frames=args.max_frames, target=args.find)
+            save_golden(path, run, model_name)
+            print(f"{clip}: {len(run['detections'])} frames, {len(run['announcements'])} announcements -> {path}")
+            continue
+
+        if not os.path.exists(path):
+            print(f"{clip}: no golden output, run 'record' first")
+            continue
+        golden = load_golden(path)
+        max_frames = len(golden["detections"])
+        candidate = run_clip(clip, detector, skip=args.skip, max_frames=max_frames, target=args.find)
+        result = score(golden, candidate)
+        print(f"{clip}: vs {golden['model']}  mAP50 {result['map50']:.3f}  mAP50-95 {result['map50_95']:.3f}  "
+              f"speedup {result['speedup']:.2f}x")
+        print(f"  announcements: {len(golden['announcements'])} golden, {len(result['missed'])} missed, "
+              f"{len(result['extra'])} extra, shared ones shifted {result['mean_shift']:.1f} frames on average")
+        for frame, message in result["missed"]:
+            print(f"  - frame {frame:5d}  {message}")
+        for frame, message in result["extra"]:
+            print(f"  + frame {frame:5d}  {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Memory-mapped, preprocessed training dataset.
+
+CPU training is dominated by decoding JPEGs and letterboxing them again every
+epoch. Preparing a dataset once writes every image, letterboxed to a fixed
+square size, into a single memory-mapped .npy array per split, together with a
+label index (labels already mapped into letterboxed coordinates). Training then
+reads images as zero-copy views of that array and the augmentation pipeline
+works directly on them.
+
+Usage:
+    python mmap_dataset.py --data "path/to/data.yaml" --out cache/housing --imgsz 640
+    python train.py --data cache/housing/data.yaml
+"""
+import argparse
+import glob
+import os
+import cv2
+import numpy as np
+import yaml
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.data.utils import IMG_FORMATS, check_det_dataset, img2label_paths
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import de_parallel
+
+PAD_VALUE = 114  # Same gray as the Ultralytics letterbox
+
+
+def list_images(path):
+    """Image files of a split given as a directory, a list file, or a list of either."""
+    if isinstance(path, (list, tuple)):
+        return [f for p in path for f in list_images(p)]
+    if os.path.isdir(path):
+        files = glob.glob(os.path.join(path, "**", "*.*"), recursive=True)
+    else:
+        parent = os.path.dirname(path)
+        with open(path, encoding="utf-8") as f:
+            files = [os.path.join(parent, line.strip()) if line.startswith("./") else line.strip()
+                     for line in f if line.strip()]
+    return sorted(f for f in files if f.rsplit(".", 1)[-1].lower() in IMG_FORMATS)
+
+
+def letterbox(image, size):
+    """Resize `image` to fit a size x size square and pad it; returns (image, scale, (left, top))."""
+    h, w = image.shape[:2]
+    scale = size / max(h, w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    left, top = (size - new_w) // 2, (size - new_h) // 2
+    out = np.full((size, size, 3), PAD_VALUE, dtype=np.uint8)
+    out[top:top + new_h, left:left + new_w] = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return out, scale, (left, top)
+
+
+def read_labels(label_file):
+    """YOLO labels (class, x, y, w, h normalized) of one image as an (n, 5) array."""
+    if not os.path.exists(label_file):
+        return np.zeros((0, 5), dtype=np.float32)
+    labels = np.loadtxt(label_file, dtype=np.float32, ndmin=2)
+    return labels[:, :5] if labels.size else np.zeros((0, 5), dtype=np.float32)
+
+
+def prepare_split(image_files, out_prefix, size):
+    """Write one split as <prefix>_images.npy (memory-mapped) and <prefix>_labels.npz."""
+    images = np.lib.format.open_memmap(f"{out_prefix}_images.npy", mode="w+", dtype=np.uint8,
+                                       shape=(len(image_files), size, size, 3))
+    all_labels = []
+    offsets = [0]
+    shapes = np.zeros((len(image_files), 2), dtype=np.int32)
+    for i, (image_file, label_file) in enumerate(zip(image_files, img2label_paths(image_files))):
+        image = cv2.imread(image_file, cv2.IMREAD_COLOR)
+        if image is None:
+            raise FileNotFoundError(f"Image Not Found {image_file}")
+        h, w = image.shape[:2]
+        images[i], scale, (left, top) = letterbox(image, size)
+        shapes[i] = h, w
+
+        # Map normalized boxes from the original image into the letterboxed square
+        labels = read_labels(label_file)
+        labels[:, 1] = (labels[:, 1] * w * scale + left) / size
+        labels[:, 2] = (labels[:, 2] * h * scale + top) / size
+        labels[:, 3] = labels[:, 3] * w * scale / size
+        labels[:, 4] = labels[:, 4] * h * scale / size
+        all_labels.append(labels)
+        offsets.append(offsets[-1] + len(labels))
+    images.flush()
+    del images
+
+    np.savez(f"{out_prefix}_labels.npz",
+             labels=np.concatenate(all_labels) if all_labels else np.zeros((0, 5), dtype=np.float32),
+             offsets=np.array(offsets, dtype=np.int64),
+             files=np.array(image_files),
+             shapes=shapes)
+
+
+def prepare(data_yaml, out_dir, size):
+    """Preprocess the train and val splits of `data_yaml` into `out_dir`; returns the new data.yaml path."""
+    data = check_det_dataset(data_yaml)
+    os.makedirs(out_dir, exist_ok=True)
+    out_dir = os.path.abspath(out_dir)
+    for split in ("train", "val"):
+        files = list_images(data[split])
+        print(f"{split}: letterboxing {len(files)} images to {size}x{size}")
+        prepare_split(files, os.path.join(out_dir, split), size)
+
+    out_yaml = os.path.join(out_dir, "data.yaml")
+    with open(out_yaml, "w", encoding="utf-8") as f:
+        yaml.safe_dump({
+            "path": out_dir,
+            "train": "train_images.npy",
+            "val": "val_images.npy",
+            "names": data["names"],
+            "memmap": True,
+        }, f, sort_keys=False)
+    return out_yaml
+
+
+def is_memmap_dataset(data_yaml):
+    """True if `data_yaml` describes a dataset written by prepare()."""
+    if not data_yaml or not str(data_yaml).endswith((".yaml", ".yml")) or not os.path.exists(data_yaml):
+        return False
+    with open(data_yaml, encoding="utf-8") as f:
+        return bool((yaml.safe_load(f) or {}).get("memmap"))
+
+
+class MemmapYOLODataset(YOLODataset):
+    """YOLODataset that serves letterboxed images as views of a memory-mapped array."""
+
+    def get_img_files(self, img_path):
+        self.images_path = img_path
+        self._images = None
+        index = np.load(img_path.replace("_images.npy", "_labels.npz"))
+        self._labels = index["labels"]
+        self._offsets = index["offsets"]
+        return [str(f) for f in index["files"]]
+
+    @property
+    def images(self):
+        # Opened lazily so dataloader workers map the file themselves instead of receiving a copy
+        if self._images is None:
+            self._images = np.load(self.images_path, mmap_mode="r")
+        return self._images
+
+    def get_labels(self):
+        size = self.images.shape[1]
+        if size != self.imgsz:
+            raise ValueError(f"{self.images_path} was prepared at {size}px; train with imgsz={size}")
+        labels = []
+        for i, im_file in enumerate(self.im_files):
+            rows = self._labels[self._offsets[i]:self._offsets[i + 1]]
+            labels.append({
+                "im_file": im_file,
+                "shape": (size, size),
+                "cls": rows[:, 0:1].copy(),
+                "bboxes": rows[:, 1:5].copy(),
+                "segments": [],
+                "keypoints": None,
+                "normalized": True,
+                "bbox_format": "xywh",
+            })
+        return labels
+
+    def load_image(self, i, rect_mode=True):
+        im = self.images[i]  # Zero-copy view; transforms copy before they modify anything
+        if self.augment:
+            # Every image is already in memory, the buffer only feeds mosaic index selection
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                self.buffer.pop(0)
+        return im, im.shape[:2], im.shape[:2]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+
+class MemmapDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer that trains on a dataset written by prepare()."""
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        return MemmapYOLODataset(
+            img_path=img_path,
+            imgsz=self.args.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=self.args,
+            rect=self.args.rect or mode == "val",
+            cache=None,
+            single_cls=self.args.single_cls or False,
+            stride=gs,
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=colorstr(f"{mode}: "),
+            task=self.args.task,
+            classes=self.args.classes,
+            data=self.data,
+            fraction=self.args.fraction if mode == "train" else 1.0,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preprocess a YOLO dataset into memory-mapped arrays.")
+    parser.add_argument("--data", required=True, help="Source dataset data.yaml")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--imgsz", type=int, default=640, help="Letterboxed square size")
+    args = parser.parse_args()
+    print(f"Wrote {prepare(args.data, args.out, args.imgsz)}")
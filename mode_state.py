@@ -0,0 +1,105 @@
+"""
+Lock-free interaction state shared by the voice command handler and the video loop.
+
+The launchers kept the mode, the Find-mode target and the announcement and
+listening flags in module globals behind two nested locks. The command
+handler held them while clearing the speech queue and queueing replies, and
+the video loop took them every frame just to read the mode, so a voice
+interaction could stall the display.
+
+ModeState holds the whole state as one immutable, versioned snapshot.
+Writers build a new snapshot and publish it by replacing a single reference,
+so readers always see a consistent state without taking a lock. Every
+publish is also delivered as an event to each subscription, so the video
+loop only reconfigures the pipeline when something actually changed.
+
+    state = ModeState()
+    changes = state.subscribe()
+    state.publish(mode="find", target_class="chair")  # Command handler
+    state.update(after_interaction)                   # Change derived from the current state
+    snapshot = changes.poll()                         # Video loop: newest snapshot or None
+"""
+import collections
+import queue
+import threading
+
+
+class ModeSnapshot(collections.namedtuple("ModeSnapshot", "version mode target_class announcements listening")):
+    """
+    One consistent state.
+
+    mode           "normal" (announce objects) or "find" (guide to target_class)
+    announcements  Normal-mode object announcements are on
+    listening      the background listener is not busy with an interaction
+    """
+
+    __slots__ = ()
+
+    @property
+    def announce(self):
+        """Whether the pipeline may speak: announcements in Normal mode, guidance in Find mode unless interrupted."""
+        return self.announcements if self.mode == "normal" else self.listening
+
+
+def after_interaction(snapshot):
+    """Changes that end a voice interaction: listen again, announce objects again only in Normal mode."""
+    return {"announcements": snapshot.mode == "normal", "listening": True}
+
+
+class Subscription:
+    """Snapshots published after subscribe(), in order."""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def put(self, snapshot):
+        self._queue.put(snapshot)
+
+    def poll(self):
+        """Newest snapshot published since the last poll, or None; never blocks."""
+        latest = None
+        while True:
+            try:
+                latest = self._queue.get_nowait()
+            except queue.Empty:
+                return latest
+
+    def wait(self, timeout=None):
+        """Next published snapshot, or None on timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class ModeState:
+    """Versioned snapshot published by the command handler and read without locks."""
+
+    def __init__(self, mode="normal", target_class="person", announcements=True, listening=True):
+        self.snapshot = ModeSnapshot(0, mode, target_class, announcements, listening)
+        self._write_lock = threading.Lock()  # Orders concurrent writers; readers never take it
+        self._subscriptions = []
+
+    def publish(self, **changes):
+        """Replace the given fields, bump the version and notify subscribers; returns the new snapshot."""
+        return self.update(lambda snapshot: changes)
+
+    def update(self, fn):
+        """
+        Publish the changes `fn(snapshot)` returns for the current snapshot.
+
+        `fn` runs under the write lock, so a change derived from the current
+        state cannot be lost to a concurrent publish.
+        """
+        with self._write_lock:
+            snapshot = self.snapshot._replace(version=self.snapshot.version + 1, **fn(self.snapshot))
+            self.snapshot = snapshot  # A single reference assignment: readers see the old or the new state
+            for subscription in self._subscriptions:
+                subscription.put(snapshot)
+        return snapshot
+
+    def subscribe(self):
+        subscription = Subscription()
+        with self._write_lock:
+            self._subscriptions.append(subscription)
+        return subscription
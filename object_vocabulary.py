@@ -0,0 +1,202 @@
+"""
+Find-mode vocabulary: maps what the user says to the detector's class names.
+
+Object_List.txt lists every class with its synonyms; plurals are generated.
+At load time every name is indexed three ways:
+
+    exact     the name itself ("chairs" -> chair), also when spelled out as
+              letter names ("tee vee" -> tv)
+    phonetic  a sound-alike key, so misrecognized words that sound the same
+              and are spelled almost the same still match ("find a cheer" -> chair)
+    fuzzy     every variant of the name with up to two letters deleted
+              (symmetric-delete spelling correction, "refridgerator" -> refrigerator)
+
+Resolving an utterance only generates keys from the words that were said and
+looks them up in dicts, so its cost depends on the utterance length, not on the
+number of classes.
+"""
+import itertools
+import os
+
+OBJECT_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Object_List.txt")
+MAX_EDITS = 2  # Largest spelling distance the fuzzy index accepts
+MIN_FUZZY_LENGTH = 3  # Shorter words are only matched exactly or phonetically
+MIN_PHONETIC_CODES = 2  # Sound-alike keys of a single consonant ("tee", "tie", "two") match too much
+
+# Words that carry no object name, stripped before matching
+FILLER_WORDS = {
+    "a", "an", "the", "my", "me", "some", "any", "of", "to", "for", "please", "i", "you", "can",
+    "find", "where", "is", "are", "look", "locate", "search", "want", "need", "help", "show",
+    "hello", "system", "mode", "on", "normal",
+}
+
+# Spoken letter names, so spelled-out names like "tee vee" match
+LETTER_NAMES = {
+    "ay": "a", "bee": "b", "see": "c", "cee": "c", "dee": "d", "ee": "e", "eff": "f", "gee": "g",
+    "aitch": "h", "eye": "i", "jay": "j", "kay": "k", "el": "l", "em": "m", "en": "n", "oh": "o",
+    "pee": "p", "cue": "q", "ar": "r", "ess": "s", "tee": "t", "you": "u", "vee": "v", "ex": "x",
+    "why": "y", "zee": "z", "zed": "z",
+}
+
+# Letter pairs that sound like one consonant, replaced before coding
+_DIGRAPHS = [("ph", "f"), ("ck", "k"), ("sh", "x"), ("ch", "x"), ("th", "0"), ("wh", "w"),
+             ("kn", "n"), ("wr", "r"), ("gh", "g"), ("qu", "kw")]
+# Voiced and unvoiced consonants that recognizers mix up share a code
+_CONSONANTS = {"b": "p", "d": "t", "g": "k", "c": "k", "q": "k", "v": "f", "z": "s", "j": "x"}
+
+
+def pluralize(name):
+    """Regular English plural of the last word of `name`."""
+    head, _, word = name.rpartition(" ")
+    if word.endswith(("s", "x", "z", "ch", "sh")):
+        word += "es"
+    elif word.endswith("y") and word[-2:-1] not in "aeiou":
+        word = word[:-1] + "ies"
+    else:
+        word += "s"
+    return f"{head} {word}" if head else word
+
+
+def phonetic_word(word):
+    """Sound-alike key of one word: first sound kept, vowels dropped, similar consonants merged."""
+    word = "".join(ch for ch in word.lower() if ch.isalpha())
+    if not word:
+        return ""
+    for pair, code in _DIGRAPHS:
+        word = word.replace(pair, code)
+    key = [word[0] if word[0] in "aeiou" else _CONSONANTS.get(word[0], word[0])]
+    for ch in word[1:]:
+        if ch in "aeiouhwy":
+            continue
+        code = "s" if ch == "x" and key[-1] != "k" else _CONSONANTS.get(ch, ch)
+        if code != key[-1]:
+            key.append(code)
+    return "".join(key)
+
+
+def phonetic_key(phrase):
+    # Words are joined so a split like "tee vee" still sounds like "tv"
+    return "".join(phonetic_word(word) for word in phrase.split())
+
+
+def deletes(text, max_edits=MAX_EDITS):
+    """`text` and every string obtained by deleting up to `max_edits` characters from it."""
+    variants = {text}
+    frontier = {text}
+    for _ in range(max_edits):
+        frontier = {v[:i] + v[i + 1:] for v in frontier for i in range(len(v))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between two strings."""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def allowed_edits(text):
+    """Spelling distance tolerated for a name of this length."""
+    return 1 if len(text) <= 5 else MAX_EDITS
+
+
+def phonetic_edits(text):
+    """Spelling distance tolerated between sound-alikes: one letter for short words, about a third beyond."""
+    return 1 if len(text) <= 4 else max(2, len(text) // 3)
+
+
+def spelled(phrase):
+    """"tee vee" -> "tv" if every word is a letter name, else None."""
+    letters = [LETTER_NAMES.get(word) for word in phrase.split()]
+    return "".join(letters) if len(letters) > 1 and all(letters) else None
+
+
+def read_object_list(path=OBJECT_LIST):
+    """{class name: [synonyms]} from an object list file."""
+    classes = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            name, _, synonyms = line.partition(":")
+            classes[name.strip().lower()] = [s.strip().lower() for s in synonyms.split(",") if s.strip()]
+    return classes
+
+
+class ObjectVocabulary:
+    """Precomputed exact, phonetic and fuzzy lookup of spoken object names."""
+
+    def __init__(self, classes):
+        self.classes = list(classes)
+        self.exact = {}  # name -> class
+        self.phonetic = {}  # phonetic key -> names
+        self.fuzzy = {}  # name with letters deleted -> names
+        for cls, synonyms in classes.items():
+            for name in [cls] + list(synonyms):
+                for variant in (name, pluralize(name)):
+                    self._add(variant, cls)
+        self.max_words = max((len(name.split()) for name in self.exact), default=1)
+
+    def _add(self, name, cls):
+        self.exact.setdefault(name, cls)
+        self.phonetic.setdefault(phonetic_key(name), set()).add(name)
+        if len(name) >= MIN_FUZZY_LENGTH:
+            for variant in deletes(name, allowed_edits(name)):
+                self.fuzzy.setdefault(variant, set()).add(name)
+
+    def names(self):
+        """Every indexed name, including synonyms and plurals."""
+        return list(self.exact)
+
+    def _closest(self, text, candidates, max_distance):
+        best = None
+        for name in candidates:
+            distance = edit_distance(text, name)
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, name)
+        return self.exact[best[1]] if best else None
+
+    def _phrases(self, text):
+        """Word n-grams of the utterance without filler words, longest first."""
+        words = [w for w in "".join(ch if ch.isalnum() else " " for ch in text.lower()).split()
+                 if w not in FILLER_WORDS]
+        for n in range(min(self.max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                yield " ".join(words[i:i + n])
+
+    def resolve(self, text):
+        """Class name of the object mentioned in `text`, or None."""
+        phrases = list(self._phrases(text))
+        for phrase in phrases:
+            if phrase in self.exact:
+                return self.exact[phrase]
+            if spelled(phrase) in self.exact:
+                return self.exact[spelled(phrase)]
+        for phrase in phrases:
+            key = phonetic_key(phrase)
+            if len(key) < MIN_PHONETIC_CODES:
+                continue
+            # Same key, and spelled nearly the same: "cheer" is chair, but "back" is not book
+            cls = self._closest(phrase, self.phonetic.get(key, ()), phonetic_edits(phrase))
+            if cls:
+                return cls
+        for phrase in phrases:
+            if len(phrase) < MIN_FUZZY_LENGTH:
+                continue
+            candidates = set(itertools.chain.from_iterable(
+                self.fuzzy.get(variant, ()) for variant in deletes(phrase, allowed_edits(phrase))))
+            cls = self._closest(phrase, candidates, allowed_edits(phrase))
+            if cls:
+                return cls
+        return None
+
+
+def load_vocabulary(path=OBJECT_LIST):
+    """Build the vocabulary index from an object list file."""
+    return ObjectVocabulary(read_object_list(path))
@@ -0,0 +1,114 @@
+"""
+Fast-path alerts for obstacles the user is about to walk into.
+
+Announcements wait their turn in the speaker queue, so "Person ahead,
+getting closer" can come out seconds after the person stepped into the way.
+ObstacleMonitor checks every frame's tracks for an obstacle in the corridor
+straight ahead that is approaching: it will be reached within a few seconds
+(its time to collision, see ttc.py), or it already fills much of the frame
+and is still getting closer. Objects that are merely large, like a table
+the camera stands still in front of, never alert. A close obstacle whose box
+grows from one frame to the next is alerted about before its track is
+confirmed, since waiting for more frames would cost the time the alert is
+meant to save. A track is alerted about again only once it has become
+clearly more urgent. The pipeline then calls speaker.alert(), which drops
+everything queued, cuts off the phrase being spoken and plays a short
+precomputed tone at once, followed by a short phrase naming the obstacle.
+"""
+import math
+import numpy as np
+from tracker import box_area
+
+# COCO classes that block the walking path
+OBSTACLE_CLASSES = {
+    "person", "bicycle", "car", "motorcycle", "bus", "truck", "fire hydrant", "stop sign",
+    "parking meter", "bench", "dog", "horse", "suitcase", "chair", "couch", "potted plant",
+    "bed", "dining table", "toilet", "refrigerator",
+}
+CORRIDOR_WIDTH = 0.4  # Fraction of the frame width, centred, that counts as the walking path
+MIN_AREA = 0.03  # Fraction of the frame a looming obstacle must cover to count
+NEAR_AREA = 0.3  # Fraction of the frame at which an approaching obstacle is too close however slowly it comes
+LOOM_TTC = 4.0  # Seconds to collision at which an obstacle counts as looming
+NEAR_TTC = 8.0  # ... and for an obstacle covering NEAR_AREA; slower "growth" is detector jitter
+MIN_GROWTH = 0.01  # Smoothed per-frame growth of width and height that makes an unconfirmed close box approaching
+REALERT_RATIO = 0.5  # A track is alerted about again once its time to collision drops to this fraction
+ALERT_REPEAT_SECONDS = 3.0  # Minimum time between two alerts about the same track
+FORGET_SECONDS = 3.0  # Alert history of a track unseen this long is dropped
+
+TONE_SAMPLE_RATE = 22050
+TONE_FREQUENCY = 1320.0  # Hz, high enough to stand out from speech
+TONE_BEEPS = 2
+TONE_BEEP_SECONDS = 0.07
+
+
+def alert_tone(sample_rate=TONE_SAMPLE_RATE, frequency=TONE_FREQUENCY, beeps=TONE_BEEPS,
+               beep_seconds=TONE_BEEP_SECONDS):
+    """Short beeps as an int16 (samples, 1) array, ready for sounddevice."""
+    t = np.arange(int(sample_rate * beep_seconds)) / sample_rate
+    beep = np.sin(2 * np.pi * frequency * t)
+    fade = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.005)  # 5 ms ramps avoid clicks
+    beep *= fade
+    gap = np.zeros(len(beep) // 2)
+    signal = np.concatenate([np.concatenate([beep, gap]) for _ in range(beeps)])
+    return (signal * 0.6 * 32767).astype(np.int16)[:, None]
+
+
+class ObstacleMonitor:
+    """Per-frame check of the confirmed tracks for looming obstacles in the walking path."""
+
+    def __init__(self, names, obstacle_classes=OBSTACLE_CLASSES, corridor=CORRIDOR_WIDTH):
+        self.obstacle_ids = {i for i, name in names.items() if name in obstacle_classes}
+        self.names = names
+        self.corridor = corridor
+        self.tone = alert_tone(), TONE_SAMPLE_RATE
+        self._alerted = {}  # Track id -> [urgency of its last alert, time of that alert, time last seen]
+
+    def check(self, tracks, ttc, frame_shape, now, tentative=()):
+        """
+        The most urgent approaching obstacle among `tracks` as (message, class id), or None.
+
+        `ttc` holds the tracks' times to collision and `now` is the capture time
+        of the frame they come from. `tentative` are tracks seen in this frame
+        but not confirmed yet; they have no time to collision and only count
+        once they cover NEAR_AREA and their box grows.
+        """
+        height, width = frame_shape[:2]
+        lo, hi = width * (1 - self.corridor) / 2, width * (1 + self.corridor) / 2
+        urgent, urgency = None, math.inf
+        candidates = list(zip(tracks, ttc)) + [(track, None) for track in tentative]
+        for track, seconds in candidates:
+            if track.cls not in self.obstacle_ids:
+                continue
+            alerted = self._alerted.get(track.id)
+            if alerted is not None:
+                alerted[2] = now
+            centre = (track.box[0] + track.box[2]) / 2
+            fraction = float(box_area(track.box)) / (width * height)
+            if not lo <= centre <= hi or fraction < MIN_AREA:
+                continue
+            if seconds is None:
+                if fraction < NEAR_AREA or not is_growing(track):
+                    continue
+                seconds = 0.0  # Close and coming closer, too new for an estimate
+            elif seconds > (NEAR_TTC if fraction >= NEAR_AREA else LOOM_TTC):
+                continue  # Not approaching, or too slowly to matter yet
+            if alerted is not None and (not seconds < alerted[0] * REALERT_RATIO
+                                        or now - alerted[1] < ALERT_REPEAT_SECONDS):
+                continue  # Not clearly more urgent than when it was last alerted about
+            if seconds < urgency:
+                urgent, urgency = track, seconds
+
+        for track_id, (_, _, seen) in list(self._alerted.items()):
+            if now - seen > FORGET_SECONDS:
+                del self._alerted[track_id]
+        if urgent is None:
+            return None
+        self._alerted[urgent.id] = [urgency, now, now]
+        return f"{self.names[urgent.cls].capitalize()} ahead", urgent.cls
+
+
+def is_growing(track, min_growth=MIN_GROWTH):
+    """True if the track's box gets wider and taller by at least `min_growth` per frame."""
+    x1, y1, x2, y2 = track.box
+    vx1, vy1, vx2, vy2 = track.velocity
+    return (vx2 - vx1) >= min_growth * (x2 - x1) and (vy2 - vy1) >= min_growth * (y2 - y1)
@@ -0,0 +1,223 @@
+"""
+Pre-synthesized speech for the phrases the system says most often.
+
+Almost everything the system says comes from a small set of phrases ("Switching
+to Find mode", "<Class> detected", ...), yet pyttsx3 used to synthesize each of
+them from scratch every time. PhraseCache renders phrases to PCM once and keeps
+them in memory: the fixed system replies are rendered at startup and pinned,
+everything else is rendered on first use and evicted least-recently-used once
+the memory budget is exceeded. CachedSpeaker plays cached PCM in order through
+a low-latency sounddevice output, so a cached phrase starts playing immediately.
+pyttsx3 engines must not be shared between threads, so all rendering happens
+on the speaker thread: CachedSpeaker.preload() hands it the fixed phrases to
+render whenever it has nothing to say.
+"""
+import collections
+import os
+import queue
+import tempfile
+import threading
+import time
+import wave
+import numpy as np
+import pyttsx3
+import sounddevice as sd
+from cpu_budget import budget
+
+SPEECH_RATE = 150  # Words per minute, same as the detection announcements
+CACHE_BYTES = 16 * 1024 * 1024  # Memory budget for dynamic phrases
+
+_WAKE = ()  # Queued by preload() to wake the speaker thread
+
+# System replies, rendered at startup and never evicted
+FIXED_PHRASES = [
+    "Starting",
+    "Ready",
+    "Heyy, how can I help you?",
+    "Switching to Find mode",
+    "Switching to Normal mode",
+    "I didn't understand. Please try again.",
+    "I didn't hear you. Please try again.",
+    "Skipping switching due to unclear command. Continuing in current mode.",
+]
+
+
+class PhraseCache:
+    """PCM renderings of spoken phrases with pinned fixed phrases and an LRU for the rest."""
+
+    def __init__(self, max_bytes=CACHE_BYTES, rate=SPEECH_RATE):
+        self.max_bytes = max_bytes
+        self.rate = rate
+        self._pinned = {}
+        self._dynamic = collections.OrderedDict()
+        self._dynamic_bytes = 0
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()  # A pyttsx3 engine can only run one job at a time
+        self._engine = None
+
+    def _render(self, text):
+        """Synthesize `text` to an int16 (samples, channels) array and its sample rate."""
+        with self._render_lock:
+            if self._engine is None:
+                # A private engine, so rendering never interferes with other pyttsx3 users
+                self._engine = pyttsx3.Engine()
+                self._engine.setProperty('rate', self.rate)
+            fd, path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                self._engine.save_to_file(text, path)
+                self._engine.runAndWait()
+                with wave.open(path, "rb") as wav:
+                    channels = wav.getnchannels()
+                    sample_rate = wav.getframerate()
+                    pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+            finally:
+                os.remove(path)
+        return pcm.reshape(-1, channels), sample_rate
+
+    def get(self, text, pin=False):
+        """Return (pcm, sample_rate) for `text`, rendering it on first use."""
+        with self._lock:
+            if text in self._pinned:
+                return self._pinned[text]
+            if text in self._dynamic:
+                if pin:
+                    entry = self._pinned[text] = self._dynamic.pop(text)
+                    self._dynamic_bytes -= entry[0].nbytes
+                    return entry
+                self._dynamic.move_to_end(text)
+                return self._dynamic[text]
+
+        entry = self._render(text)
+        with self._lock:
+            if pin:
+                self._pinned[text] = entry
+            elif text not in self._dynamic:
+                self._dynamic[text] = entry
+                self._dynamic_bytes += entry[0].nbytes
+                # Evict least recently used phrases, but always keep the newest one
+                while self._dynamic_bytes > self.max_bytes and len(self._dynamic) > 1:
+                    _, (pcm, _) = self._dynamic.popitem(last=False)
+                    self._dynamic_bytes -= pcm.nbytes
+        return entry
+
+    def preload(self, phrases=FIXED_PHRASES):
+        """Render and pin `phrases` on the calling thread."""
+        for text in phrases:
+            self.get(text, pin=True)
+
+
+class CachedSpeaker:
+    """Speaks queued phrases in order from a PhraseCache on a dedicated thread."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.queue = queue.Queue()
+        self._play_lock = threading.Lock()
+        self._alert_until = 0.0  # perf_counter() time the current alert sound ends
+        self._generation = 0  # Bumped by clear(); phrases queued before it are never played
+        self._to_preload = collections.deque()  # Phrases to render while there is nothing to say
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def say(self, text, expires=None, on_start=None):
+        """
+        Queue `text` to be spoken after anything already queued.
+
+        If `expires` (a time.perf_counter() value) has passed by the time the
+        phrase comes up, it is skipped. `on_start` is called when playback starts.
+        """
+        self.queue.put((text, expires, on_start, self._generation))
+
+    def clear(self):
+        """
+        Drop queued phrases and cut off the one being played.
+
+        Returns once the speaker is silent: a phrase the speaker thread had
+        already taken from the queue, and is still rendering, is not played.
+        An alert tone that is still sounding is left to finish.
+        """
+        with self._play_lock:
+            self._generation += 1
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if time.perf_counter() >= self._alert_until:
+                sd.stop()
+
+    def alert(self, sound, text=None, expires=None, on_start=None):
+        """
+        Preempt all other audio: drop the queue, cut off the current phrase and play `sound` now.
+
+        `sound` is a (pcm, sample_rate) pair, played from the calling thread so
+        it never waits for synthesis. `text` is spoken right after it, and
+        `on_start` is called when it starts. If an
+        earlier alert's tone is still sounding, it plays on instead of restarting.
+        """
+        pcm, sample_rate = sound
+        self.clear()
+        with self._play_lock:
+            now = time.perf_counter()
+            if now >= self._alert_until:
+                sd.play(pcm, sample_rate, blocking=False, latency="low")
+                self._alert_until = now + len(pcm) / sample_rate
+        if text is not None:
+            self.say(text, expires=expires, on_start=on_start)
+
+    def preload(self, phrases=FIXED_PHRASES):
+        """Have the speaker thread render and pin `phrases` while it has nothing to say."""
+        self._to_preload.extend(phrases)
+        self.queue.put(_WAKE)
+
+    def close(self):
+        self.queue.put(None)
+
+    def _run(self):
+        # Synthesis and the output stream's callback thread run on the audio cores
+        budget.pin_current_thread("audio")
+        while True:
+            if self._to_preload and self.queue.empty():
+                text = self._to_preload.popleft()
+                try:
+                    self.cache.get(text, pin=True)
+                except Exception as e:
+                    print(f"Error rendering '{text}': {e}")
+                continue
+            entry = self.queue.get()
+            if entry is None:
+                break
+            if entry is _WAKE:
+                continue
+            text, expires, on_start, generation = entry
+            if expires is not None and time.perf_counter() > expires:
+                continue  # Too stale to be worth saying
+            try:
+                pcm, sample_rate = self.cache.get(text)
+                if expires is not None and time.perf_counter() > expires:
+                    continue  # Went stale while it was rendered
+                # Never cut off an alert; alert() may also start one while this phrase plays
+                played = False
+                while True:
+                    with self._play_lock:
+                        if generation != self._generation:
+                            break  # Cleared while it was rendered or waited for an alert
+                        delay = self._alert_until - time.perf_counter()
+                        if delay <= 0:
+                            sd.play(pcm, sample_rate, blocking=False, latency="low")
+                            played = True
+                            break
+                    time.sleep(delay)
+                if not played:
+                    continue
+                if on_start is not None:
+                    on_start()
+                sd.wait()
+            except Exception as e:
+                print(f"Error speaking '{text}': {e}")
+
+
+# Shared by the launchers so replies and announcements play in one ordered stream
+phrase_cache = PhraseCache()
+speaker = CachedSpeaker(phrase_cache)
@@ -0,0 +1,396 @@
+"""
+Staged detection pipeline: capture -> infer -> postprocess -> output.
+
+The detection generators used to read a frame, run the model, draw and announce
+one after another, so every frame cost the sum of all stages. Here each stage
+runs on its own thread and hands work to the next through a small bounded
+queue. A full queue drops its oldest item instead of blocking, so a slow stage
+always works on the newest frame and never builds a backlog; throughput is set
+by the slowest stage.
+
+Every frame carries its capture timestamp. Announcements expire a fixed time
+after the frame they describe was captured, so the speaker skips results that
+are too stale to be useful. Obstacles looming in the walking path skip the
+queue altogether: postprocess checks every frame for them and has the speaker
+preempt everything else with an alert. In Find mode an optional EarconPlayer
+gets the target's direction and distance every frame and keeps beeping it,
+independently of the speech queue.
+
+Frames are read into buffers from a FramePool and drawn on in place. A buffer
+goes back to the pool when a queue drops its frame or when the next frame is
+displayed, so a running pipeline allocates no new frame arrays.
+
+Video files are read by a FileSource, which loops at the end of the clip
+instead of ending the pipeline. With realtime=False the file is replayed as
+fast as the stages can go and the queues wait for space instead of dropping,
+so offline evaluation sees every frame.
+
+    pipeline = DetectionPipeline(source=0)
+    pipeline.start()
+    pipeline.set_mode("find", target_class="chair")
+    for frame in pipeline.frames():
+        cv2.imshow("Detections", frame)
+"""
+import collections
+import threading
+import time
+from detector import YoloDetector, draw_detections
+from tracker import IoUTracker, pending_announcements, mark_announced, direction_of
+from roi_refine import RoiRefiner
+from buffer_pool import FramePool
+from obstacle_alert import ObstacleMonitor
+from ttc import TTCEstimator
+from file_source import open_source
+
+QUEUE_SIZE = 2  # Frames buffered between two stages
+MAX_ANNOUNCE_AGE = 1.0  # Seconds after capture an announcement is still worth speaking
+FIND_REPEAT_SECONDS = 2.0  # Minimum time between two Find-mode guidance messages
+ALERT_PHRASE_SECONDS = 1.0  # Time to say an alert's phrase after its tone; earcons stay muted until then
+FIND_LOST_SECONDS = 1.5  # The target counts as lost after this long out of view
+
+
+class DropOldestQueue:
+    """
+    Bounded FIFO whose put() discards the oldest item when full instead of blocking.
+
+    With lossless=True put() waits for space instead, for replays that must not skip frames.
+    """
+
+    def __init__(self, maxsize=QUEUE_SIZE, on_drop=None, lossless=False):
+        self.items = collections.deque()
+        self.maxsize = maxsize
+        self.on_drop = on_drop  # Called with every dropped item
+        self.lossless = lossless
+        self.dropped = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if self.lossless:
+                self._cond.wait_for(lambda: len(self.items) < self.maxsize or self.closed)
+            if len(self.items) >= self.maxsize:
+                dropped = self.items.popleft()
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(dropped)
+            self.items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Oldest item, or None on timeout or once the queue is closed and empty."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.items or self.closed, timeout):
+                return None
+            item = self.items.popleft() if self.items else None
+            self._cond.notify_all()  # Wakes a lossless put() waiting for space
+            return item
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class FrameItem:
+    """A captured frame and everything the stages add to it."""
+
+    __slots__ = ("index", "frame", "capture_time", "capture_wall_time", "settings", "detections", "tracks")
+
+    def __init__(self, index, frame):
+        self.index = index
+        self.frame = frame
+        self.capture_time = time.perf_counter()  # For staleness checks
+        self.capture_wall_time = time.time()  # For the detection log
+        self.settings = None
+        self.detections = None
+        self.tracks = None
+
+    def age(self):
+        return time.perf_counter() - self.capture_time
+
+
+class StageStats:
+    """Average processing time of one stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+
+    def mean_ms(self):
+        return self.total / self.count * 1000 if self.count else 0.0
+
+
+class DetectionPipeline:
+    """Capture, inference, postprocessing and output running as concurrent stages."""
+
+    def __init__(self, source=0, detector=None, speaker=None, detection_log=None,
+                 queue_size=QUEUE_SIZE, max_announce_age=MAX_ANNOUNCE_AGE, realtime=True, earcons=None,
+                 frame_time=None):
+        self.source = source
+        self.detector = detector
+        self.speaker = speaker
+        self.detection_log = detection_log
+        self.queue_size = queue_size
+        self.max_announce_age = max_announce_age
+        self.realtime = realtime  # False replays files at maximum speed without dropping frames
+        self.earcons = earcons  # EarconPlayer for continuous Find-mode guidance, optional
+        self.frame_time = frame_time  # Frame index -> capture time, e.g. clip time for replays; None uses the clock
+        # (mode, target class, announce) replaced as a whole so stages never see half an update
+        self.settings = ("normal", None, True)
+        self.finished = False
+        self._threads = []
+        self._running = False
+
+    def set_mode(self, mode, target_class=None, announce=True):
+        """Switch between "normal" (announce objects) and "find" (guide to `target_class`)."""
+        self.settings = (mode, target_class, announce)
+
+    def start(self):
+        """Load the model if needed and start the stage threads."""
+        if self.detector is None:
+            self.detector = YoloDetector()
+        self.finished = False
+        self._running = True
+        self.pool = None  # Created by the capture stage once the camera resolution is known
+        self._displayed = None
+        lossless = not self.realtime
+        self.to_infer = DropOldestQueue(self.queue_size, on_drop=self._recycle, lossless=lossless)
+        self.to_postprocess = DropOldestQueue(self.queue_size, on_drop=self._recycle, lossless=lossless)
+        # The display only ever wants the newest frame
+        self.to_output = DropOldestQueue(1, on_drop=self._recycle, lossless=lossless)
+        self.stats = {name: StageStats() for name in ("capture", "infer", "postprocess")}
+        self.tracker = IoUTracker()
+        self.refiner = RoiRefiner(self.detector)
+        self.ttc = TTCEstimator()
+        self.obstacles = ObstacleMonitor(self.detector.names)
+        self._target_hint = None  # Predicted target box for the next Find-mode frame, set by postprocess
+        self._last_mode = "normal"  # Mode of the previous postprocessed frame
+        self._queued = {}  # Track id -> expiry of its announcement waiting in the speaker queue
+        self._find_state = {"target": None, "direction": None, "last_seen": 0.0, "last_spoken": 0.0}
+        self._threads = [threading.Thread(target=stage, name=f"pipeline-{stage.__name__.strip('_')}", daemon=True)
+                         for stage in (self._capture, self._infer, self._postprocess)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running = False
+        self._set_earcon(None)
+        for queue in (self.to_infer, self.to_postprocess, self.to_output):
+            queue.close()
+        for thread in self._threads:
+            thread.join()
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def next_frame(self, timeout=None):
+        """
+        Newest annotated frame, or None on timeout or when the source has ended.
+
+        The frame's buffer is reused once next_frame() is called again.
+        """
+        item = self.to_output.get(timeout)
+        if item is None:
+            return None
+        self._recycle(self._displayed)
+        self._displayed = item
+        return item.frame
+
+    def _recycle(self, item):
+        if item is not None and self.pool is not None:
+            self.pool.release(item.frame)
+
+    def frames(self):
+        """Annotated frames until the source ends."""
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def report(self):
+        """Print per-stage timings and drops."""
+        queues = {"capture": self.to_infer, "infer": self.to_postprocess, "postprocess": self.to_output}
+        for name, stats in self.stats.items():
+            print(f"  {name:<12}{stats.mean_ms():8.1f} ms/frame  {stats.count:6d} frames  "
+                  f"{queues[name].dropped:5d} dropped downstream")
+        if self.pool is not None:
+            print(f"  frame pool: {self.pool.count} buffers of {self.pool.shape}, {self.pool.misses} extra allocations")
+
+    def _capture(self):
+        capture = open_source(self.source, realtime=self.realtime)
+        index = 0
+        try:
+            while self._running:
+                start = time.perf_counter()
+                buffer = self.pool.acquire() if self.pool is not None else None
+                ok, frame = capture.read(buffer)
+                if not ok:
+                    print("Can't receive frame (stream end?).")
+                    break
+                if self.pool is None:
+                    # Enough buffers for every queue slot, every stage and the displayed frame
+                    self.pool = FramePool(frame.shape, count=2 * self.queue_size + 5)
+                elif frame is not buffer:
+                    self.pool.release(buffer)  # The source changed resolution
+                item = FrameItem(index, frame)
+                if self.frame_time is not None:
+                    item.capture_time = self.frame_time(index)
+                self.to_infer.put(item)
+                self.stats["capture"].add(time.perf_counter() - start)
+                index += 1
+        finally:
+            capture.release()
+            self.to_infer.close()
+
+    def _infer(self):
+        try:
+            while self._running:
+                item = self.to_infer.get()
+                if item is None:
+                    break
+                start = time.perf_counter()
+                # Settings are read once per frame so every later stage agrees on them
+                item.settings = self.settings
+                mode, target_class, _ = item.settings
+                target_id = self.detector.class_id(target_class) if mode == "find" else None
+                if target_id is not None:
+                    # Low resolution over the frame, high resolution where the target is expected
+                    item.detections = self.refiner.detect(item.frame, target_id, hint=self._target_hint)
+                else:
+                    item.detections = self.detector.detect(item.frame)
+                self.to_postprocess.put(item)
+                self.stats["infer"].add(time.perf_counter() - start)
+        finally:
+            self.to_postprocess.close()
+
+    def _postprocess(self):
+        try:
+            while self._running:
+                item = self.to_postprocess.get()
+                if item is None:
+                    break
+                start = time.perf_counter()
+                mode, target_class, announce = item.settings
+                names = self.detector.names
+                if self.detection_log is not None:
+                    detections = item.detections
+                    self.detection_log.log_frame(detections[:, :4], detections[:, 5], detections[:, 4],
+                                                 timestamp=item.capture_wall_time)
+                # Tracks are kept up to date in both modes so IDs survive mode switches
+                item.tracks = self.tracker.update(item.detections)
+                ttc = self.ttc.update(item.tracks, item.capture_time)
+                # Safety first: in every mode, and even while announcements are paused
+                # Tracks seen this frame but not confirmed yet only alert when already very close
+                tentative = [t for t in self.tracker.tracks if t.missed == 0 and t.hits < self.tracker.min_hits]
+                alert = self.obstacles.check(item.tracks, ttc, item.frame.shape, item.capture_time, tentative)
+                if alert is not None:
+                    self._alert(item, *alert)
+                if mode == "find":
+                    self._guide(item, target_class, announce)
+                else:
+                    self._set_earcon(None)
+                    if self._last_mode == "find":
+                        # Objects that were already in view while finding are not news
+                        for track in item.tracks:
+                            mark_announced(track, item.frame.shape[1])
+                    self._announce_tracks(item, announce, ttc)
+                self._last_mode = mode
+                draw_detections(item.frame, item.detections, names, highlight=target_class if mode == "find" else None)
+                self.to_output.put(item)
+                self.stats["postprocess"].add(time.perf_counter() - start)
+        finally:
+            self.finished = True
+            self.to_output.close()
+
+    def _say(self, item, message, class_id=-1, on_start=None):
+        """Queue `message` for speaking; `on_start` is called if and when it starts playing."""
+        if self.speaker is None:
+            return
+        print(message)
+        self.speaker.say(message, expires=item.capture_time + self.max_announce_age,
+                         on_start=self._on_spoken(message, class_id, on_start))
+
+    def _on_spoken(self, message, class_id, on_start=None):
+        """Callback for the speaker that logs `message` when it is actually heard, then calls `on_start`."""
+        def spoken():
+            # Phrases that go stale or are cleared before they play are never logged as announced
+            if self.detection_log is not None:
+                self.detection_log.log_announcement(message, class_id)
+            if on_start is not None:
+                on_start()
+        return spoken
+
+    def _set_earcon(self, direction, area_fraction=0.0):
+        if self.earcons is not None:
+            self.earcons.guide(direction, area_fraction)
+
+    def _alert(self, item, message, class_id):
+        if self.speaker is None:
+            return
+        print(f"ALERT: {message}")
+        if self.earcons is not None:
+            # The alert pre-empts all audio, the Find-mode beeps included
+            pcm, sample_rate = self.obstacles.tone
+            self.earcons.mute(len(pcm) / sample_rate + ALERT_PHRASE_SECONDS)
+        self.speaker.alert(self.obstacles.tone, message, expires=item.capture_time + self.max_announce_age,
+                           on_start=self._on_spoken(message, class_id))
+
+    def _announce_tracks(self, item, announce, ttc):
+        """Normal mode: announce new tracks and tracks that moved or came much closer, soonest reached first."""
+        if not announce or self.speaker is None:
+            return  # Tracks stay unannounced until they are actually spoken about
+        now = item.capture_time
+        # Phrases the speaker has not started yet; past its expiry a phrase was dropped
+        for track_id, expires in list(self._queued.items()):
+            if expires <= now:
+                self._queued.pop(track_id, None)
+        width = item.frame.shape[1]
+        for message, cls, track in pending_announcements(item.tracks, self.detector.names, width, ttc):
+            if track.id in self._queued:
+                continue  # Already waiting to be said
+            self._queued[track.id] = now + self.max_announce_age
+            box = track.box.copy()
+
+            def on_start(track=track, box=box):
+                # Marked once the phrase plays, as it was when queued; a dropped phrase leaves it unannounced
+                mark_announced(track, width, box)
+                self._queued.pop(track.id, None)
+
+            self._say(item, message, cls, on_start)
+
+    def _guide(self, item, target_class, announce):
+        """Find mode: say where the target is when it appears or changes direction."""
+        state = self._find_state
+        if state["target"] != target_class:
+            state.update(target=target_class, direction=None, last_seen=0.0, last_spoken=0.0)
+        cls = self.detector.class_id(target_class)
+        matches = item.detections[item.detections[:, 5] == cls] if cls is not None else item.detections[:0]
+        now = item.capture_time
+
+        # Tell the next inference where to look: the most established target track, even if missed this frame
+        tracks = [t for t in self.tracker.tracks if t.cls == cls]
+        self._target_hint = max(tracks, key=lambda t: t.hits).predicted_box() if tracks else None
+
+        if len(matches) == 0:
+            if now - state["last_seen"] > FIND_LOST_SECONDS:
+                state["direction"] = None
+                self._set_earcon(None)
+            return
+        state["last_seen"] = now
+        best = matches[matches[:, 4].argmax()]
+        direction = direction_of(best, item.frame.shape[1])
+        # Tones follow the target every frame; speech only when its direction changes
+        height, width = item.frame.shape[:2]
+        self._set_earcon(direction if announce else None, (best[2] - best[0]) * (best[3] - best[1]) / (width * height))
+        if direction != state["direction"] and now - state["last_spoken"] >= FIND_REPEAT_SECONDS:
+            state["direction"] = direction
+            state["last_spoken"] = now
+            if announce:
+                self._say(item, f"{target_class.capitalize()} {direction}", cls)
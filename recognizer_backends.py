@@ -0,0 +1,164 @@
+"""
+Speech-recognition backends for voice commands.
+
+The launchers used to send every phrase to recognizer.recognize_google(), so
+command latency depended on the network and voice control stopped working
+without connectivity. A backend wraps one recognition engine behind a common
+recognize(recognizer, audio) call that returns lower-case text and raises the
+usual speech_recognition errors:
+
+    offline  pocketsphinx keyword spotting restricted to the command phrases;
+             object names are spotted in a separate search, only in
+             utterances that contain "find mode on"
+    online   Google Speech Recognition (needs network access)
+    hybrid   online first, falling back to offline when the request fails
+"""
+import os
+import tempfile
+import threading
+import speech_recognition as sr
+
+# Phrases the system reacts to; the offline backend only listens for these
+COMMAND_PHRASES = ["hello system", "find mode on", "normal mode on"]
+FIND_COMMAND = "find mode on"  # May be followed by the name of the object to find
+
+SPHINX_SAMPLE_RATE = 16000  # Rate of the bundled pocketsphinx acoustic model
+KEYWORD_THRESHOLD = 1e-20  # Detection threshold for multi-word keyphrases
+# Object names are mostly one short word, which spots constantly at KEYWORD_THRESHOLD. Their threshold
+# starts at 1 and every phone of the name lowers it by this factor, so short names need a clear match.
+OBJECT_PHONE_FACTOR = 10.0
+
+
+def match_command(text):
+    """Return the first command phrase contained in `text`, or None."""
+    if not text:
+        return None
+    for phrase in COMMAND_PHRASES:
+        if phrase in text:
+            return phrase
+    return None
+
+
+class GoogleBackend:
+    """Online recognition through the Google Web Speech API."""
+
+    name = "online"
+    offline = False
+
+    def recognize(self, recognizer, audio):
+        return recognizer.recognize_google(audio).lower()
+
+
+def _write_kws(decoder, name, phrases):
+    """Add a keyword search `name` spotting (phrase, threshold) pairs to `decoder`."""
+    fd, keyfile = tempfile.mkstemp(suffix=".kws")
+    try:
+        with os.fdopen(fd, "w") as f:
+            for phrase, threshold in phrases:
+                f.write(f"{phrase} /{threshold:.0e}/\n")
+        decoder.add_kws(name, keyfile)
+    finally:
+        os.remove(keyfile)
+
+
+class SphinxBackend:
+    """Offline pocketsphinx keyword spotting over a restricted command grammar."""
+
+    name = "offline"
+    offline = True
+
+    def __init__(self, phrases=None, threshold=KEYWORD_THRESHOLD, objects=None):
+        self.phrases = list(phrases or COMMAND_PHRASES)
+        self.threshold = threshold
+        self.objects = list(objects or [])  # Object names spotted after FIND_COMMAND
+        self.decoder = self.create_decoder()
+        self._lock = threading.Lock()  # A decoder can only run one utterance at a time
+
+    def create_decoder(self):
+        """Build a pocketsphinx decoder that spots the command phrases, with a second search for object names."""
+        try:
+            from pocketsphinx import Decoder
+        except ImportError:
+            raise sr.RequestError("missing PocketSphinx module: ensure that PocketSphinx is set up correctly.")
+
+        decoder = Decoder(lm=None, loglevel="FATAL")
+        # Phrases with words missing from the pronunciation dictionary would fail the whole search
+        phrases = [p for p in self.phrases
+                   if all(decoder.lookup_word(word) is not None for word in p.split())]
+        if not phrases:
+            raise sr.RequestError("none of the command phrases are in the PocketSphinx dictionary")
+        _write_kws(decoder, "commands", [(phrase, self.threshold) for phrase in phrases])
+
+        objects = []
+        for name in self.objects:
+            pronunciations = [decoder.lookup_word(word) for word in name.split()]
+            if all(p is not None for p in pronunciations):
+                phones = sum(len(p.split()) for p in pronunciations)
+                objects.append((name, OBJECT_PHONE_FACTOR ** -phones))
+        if objects:
+            _write_kws(decoder, "objects", objects)
+        decoder.activate_search("commands")
+        return decoder
+
+    def spot_objects(self, decoder, raw):
+        """Object names spotted in 16 kHz `raw` audio by the object search of `decoder` (a create_decoder())."""
+        if not self.objects:
+            return ""
+        decoder.activate_search("objects")
+        try:
+            decoder.start_utt()
+            decoder.process_raw(raw, False, True)
+            decoder.end_utt()
+            hyp = decoder.hyp()
+        finally:
+            decoder.activate_search("commands")
+        return hyp.hypstr.strip().lower() if hyp is not None else ""
+
+    def recognize(self, recognizer, audio):
+        raw = audio.get_raw_data(convert_rate=SPHINX_SAMPLE_RATE, convert_width=2)
+        with self._lock:
+            self.decoder.start_utt()
+            self.decoder.process_raw(raw, False, True)
+            self.decoder.end_utt()
+            hyp = self.decoder.hyp()
+            text = hyp.hypstr.strip().lower() if hyp is not None else ""
+            if FIND_COMMAND in text:
+                # "find mode on, chair": look for the object only once the command is certain
+                text = f"{text} {self.spot_objects(self.decoder, raw)}".strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class FallbackBackend:
+    """Use `primary` and fall back to `secondary` when the primary request fails."""
+
+    def __init__(self, primary, secondary):
+        self.primary = primary
+        self.secondary = secondary
+        self.name = f"{primary.name}+{secondary.name}"
+        self.phrases = getattr(secondary, "phrases", None)
+        self.offline = secondary.offline
+
+    def recognize(self, recognizer, audio):
+        try:
+            return self.primary.recognize(recognizer, audio)
+        except sr.RequestError as e:
+            print(f"{self.primary.name} recognition unavailable ({e}); using {self.secondary.name}.")
+            return self.secondary.recognize(recognizer, audio)
+
+
+def get_backend(name="offline", phrases=None, objects=None):
+    """
+    Create the recognizer backend called `name` ("offline", "online" or "hybrid").
+
+    `phrases` replaces COMMAND_PHRASES as what the offline backend listens for;
+    `objects` are the object names it spots after "find mode on".
+    """
+    if name == "offline":
+        return SphinxBackend(phrases, objects=objects)
+    if name == "online":
+        return GoogleBackend()
+    if name == "hybrid":
+        return FallbackBackend(GoogleBackend(), SphinxBackend(phrases, objects=objects))
+    raise ValueError(f"Unknown recognizer backend: {name}")
@@ -0,0 +1,221 @@
+"""
+Detector that runs the model on a detection server, with local inference as fallback.
+
+RemoteDetector has the same interface as YoloDetector (names, class_id(),
+detect()), so the pipeline does not know where the model runs. Frames are
+shrunk to the model's input size and sent as JPEG to a detection_server.py,
+and the boxes that come back are scaled to the frame again. If the server
+cannot be reached, or stops answering, detection falls back to a local model,
+and the server is tried again every RETRY_SECONDS. Those attempts run on a
+background thread, so an unreachable server never stalls the inference
+thread; the local model keeps detecting until a connection is made.
+
+Class ids are fixed by whichever model answered first. If the other one
+lists different classes, its ids are remapped by class name, and its
+detections of classes the first one lacks are dropped; a model with no
+class in common is refused.
+
+    detector = RemoteDetector("192.168.1.20:8765", fallback=YoloDetector)
+"""
+import socket
+import threading
+import time
+import cv2
+import numpy as np
+from detection_server import PORT, recv_detections, recv_hello, send_request
+
+TIMEOUT = 2.0  # Seconds to wait for the server before falling back
+RETRY_SECONDS = 10.0  # Time between attempts to reach the server again
+JPEG_QUALITY = 80
+MAX_SIDE = 640  # Frames are shrunk so their larger side is at most this before sending
+
+
+def class_mapping(names, canonical):
+    """
+    Array mapping the class ids of `names` to the ids `canonical` gives the same names, or None if both agree.
+
+    Classes `canonical` does not have map to -1.
+    """
+    if names == canonical:
+        return None
+    ids = {name: i for i, name in canonical.items()}
+    mapping = np.full(max(names, default=-1) + 1, -1, dtype=np.int64)
+    for i, name in names.items():
+        mapping[i] = ids.get(name, -1)
+    return mapping
+
+
+def remap(detections, mapping):
+    """`detections` with their class ids translated through `mapping`; unmapped classes are dropped."""
+    if mapping is None:
+        return detections
+    cls = detections[:, 5].astype(np.int64)
+    ids = np.where((cls >= 0) & (cls < len(mapping)), mapping[np.clip(cls, 0, len(mapping) - 1)], -1)
+    keep = ids >= 0
+    detections = detections[keep]
+    detections[:, 5] = ids[keep]
+    return detections
+
+
+def parse_address(address):
+    """("host", port) from "host:port" or "host"."""
+    host, _, port = address.rpartition(":") if ":" in address else (address, "", "")
+    return host, int(port) if port else PORT
+
+
+class RemoteDetector:
+    """Sends frames to a detection server; runs `fallback()`'s detector locally when it is unavailable."""
+
+    def __init__(self, address, fallback=None, timeout=TIMEOUT, quality=JPEG_QUALITY, max_side=MAX_SIDE):
+        self.address = parse_address(address)
+        self.fallback = fallback  # Called once to create the local detector
+        self.timeout = timeout
+        self.quality = quality
+        self.max_side = max_side
+        self.local = None
+        self.names = {}  # Fixed by the first model to answer, server or local
+        self._remote_map = None  # Class mappings to self.names, None where ids agree
+        self._local_map = None
+        self._ids = {}
+        self._sock = None
+        self._last_attempt = -float("inf")
+        self._lock = threading.Lock()
+        self._connected = None  # (socket, names) made by the background thread, not taken up yet
+        self._connecting = None  # Background connection thread
+        if not self._connect() and self._local() is None:
+            raise ConnectionError(f"Detection server {address} unavailable and no local fallback")
+
+    @property
+    def remote(self):
+        """True while detections come from the server."""
+        return self._sock is not None
+
+    def class_id(self, name):
+        return self._ids.get(name)
+
+    def _set_names(self, names):
+        self.names = names
+        self._ids = {name: i for i, name in names.items()}
+
+    def _mapping_for(self, names, what):
+        """Mapping of `what`'s class ids to self.names, None if they agree, or False if it cannot be used."""
+        if not self.names:
+            self._set_names(names)
+            return None
+        mapping = class_mapping(names, self.names)
+        if mapping is None:
+            return None
+        if not (mapping >= 0).any():
+            print(f"{what} has no class in common with the detector's, not using it")
+            return False
+        missing = sorted(set(self.names.values()) - set(names.values()))
+        print(f"{what} lists different classes, remapping its class ids"
+              + (f"; it cannot detect {', '.join(missing)}" if missing else ""))
+        return mapping
+
+    def _open(self):
+        """A new (socket, class names) connection to the server, or None if it cannot be reached."""
+        try:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock, recv_hello(sock)
+        except (ConnectionError, OSError) as e:
+            print(f"Detection server {self.address[0]}:{self.address[1]} unavailable ({e}), detecting locally")
+            return None
+
+    def _use(self, connection):
+        sock, names = connection
+        mapping = self._mapping_for(names, "Detection server")
+        if mapping is False:
+            sock.close()
+            return False
+        self._sock, self._remote_map = sock, mapping
+        print(f"Using detection server {self.address[0]}:{self.address[1]}")
+        return True
+
+    def _connect(self):
+        """Connect on the calling thread; only used at startup."""
+        self._last_attempt = time.perf_counter()
+        connection = self._open()
+        return connection is not None and self._use(connection)
+
+    def _connect_async(self):
+        """Try to reach the server on a background thread; detect() takes the connection up once it is made."""
+        if self._connecting is not None and self._connecting.is_alive():
+            return
+        self._last_attempt = time.perf_counter()
+        self._connecting = threading.Thread(target=self._connect_in_background, name="remote-connect", daemon=True)
+        self._connecting.start()
+
+    def _connect_in_background(self):
+        connection = self._open()
+        if connection is not None:
+            with self._lock:
+                self._connected = connection
+
+    def _disconnect(self, reason):
+        print(f"Detection server connection lost ({reason}), detecting locally")
+        self._sock.close()
+        self._sock = None
+
+    def _local(self):
+        if self.local is None and self.fallback is not None:
+            local = self.fallback()
+            mapping = self._mapping_for(local.names, "Local fallback model")
+            if mapping is False:
+                self.fallback = None  # Never usable
+            else:
+                self.local, self._local_map = local, mapping
+        return self.local
+
+    def detect(self, frame, classes=None, imgsz=None):
+        """Detections of `frame` from the server, or from the local model while it is unavailable."""
+        if self._sock is None:
+            with self._lock:
+                connection, self._connected = self._connected, None
+            if connection is not None:
+                self._use(connection)
+            elif time.perf_counter() - self._last_attempt >= RETRY_SECONDS:
+                self._connect_async()
+        if self._sock is not None:
+            try:
+                return self._detect_with(self._detect_remote, self._remote_map, frame, classes, imgsz)
+            except (ConnectionError, OSError) as e:
+                self._disconnect(e)
+        local = self._local()
+        if local is None:
+            raise ConnectionError("Detection server unavailable and no local fallback")
+        detect = lambda frame, classes, imgsz: local.detect(frame, classes=classes, imgsz=imgsz)
+        return self._detect_with(detect, self._local_map, frame, classes, imgsz)
+
+    @staticmethod
+    def _detect_with(detect, mapping, frame, classes, imgsz):
+        """Run `detect` with `classes` translated to its own ids and its detections translated back."""
+        if mapping is not None and classes is not None:
+            own = {int(c): i for i, c in enumerate(mapping) if c >= 0}
+            classes = [own[c] for c in classes if c in own]
+            if not classes:
+                return np.zeros((0, 6), dtype=np.float32)
+        return remap(detect(frame, classes, imgsz), mapping)
+
+    def _detect_remote(self, frame, classes, imgsz):
+        height, width = frame.shape[:2]
+        scale = min(1.0, (imgsz or self.max_side) / max(height, width))
+        small = frame
+        if scale < 1.0:
+            small = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        send_request(self._sock, jpeg.tobytes(), imgsz, classes)
+        detections = recv_detections(self._sock)
+        if scale < 1.0:
+            detections[:, :4] *= (width / small.shape[1], height / small.shape[0]) * 2
+        return detections
+
+    def close(self):
+        with self._lock:
+            connection, self._connected = self._connected, None
+        if connection is not None:
+            connection[0].close()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
@@ -0,0 +1,437 @@
+"""
+Simulated camera, microphone and speech output for headless load tests.
+
+caller.py switches to these stand-ins when SIM_COMMANDS names a command script,
+so the full flow (startup, wake word, sub-commands, mode switches, detection,
+announcements) runs on a machine without a webcam, microphone, sound card or
+display:
+
+    camera      SyntheticScene, an endless generated video ("synthetic"), or a
+                video file through file_source.FileSource
+    microphone  ScriptedMicrophone, a speech_recognition AudioSource that plays
+                the script's WAV clips at their times over a low noise floor
+    speech      RecordingSpeaker, which takes as long as the phrase would take
+                to say and records what would have been said and when
+    earcons     SimulatedEarcons, whose mixing callback runs on a paced thread
+    display     none; the frame loop stops once the script has played out
+
+A command script has one "<seconds><TAB><wav file>" line per clip, with times
+counted from when the system says "Ready" and file names relative to the script:
+
+    # seconds  clip
+    5.0        hello_system.wav
+    8.0        find_mode_on.wav
+
+Usage:
+    SIM_COMMANDS=sim/commands.txt python caller.py
+    SIM_COMMANDS=sim/commands.txt SIM_VIDEO=Source/vid.mp4 SIM_SECONDS=120 python caller.py
+
+SIM_VIDEO defaults to the synthetic scene, SIM_SECONDS to the end of the script
+plus TAIL_SECONDS. What was said is written to SPEECH_LOG, the interaction
+trace and detection logs are written as usual, and the pipeline's stage report
+is printed at the end. For a profile of all threads, run the same command under
+a sampling profiler such as `py-spy record -o caller.svg -- python caller.py`.
+"""
+import csv
+import os
+import queue
+import threading
+import time
+import wave
+import numpy as np
+import speech_recognition as sr
+from cpu_budget import budget
+from earcons import EarconPlayer
+from file_source import SYNTHETIC_SOURCE
+
+SCENE_SIZE = (640, 480)
+SCENE_FPS = 30.0
+SCENE_OBJECTS = 5
+MIC_SAMPLE_RATE = 16000  # Rate of sr.Microphone() when none is asked for
+NOISE_LEVEL = 60.0  # Standard deviation of the microphone's noise floor, in 16-bit sample units
+MAX_BACKLOG = 0.1  # Seconds of audio a microphone keeps while nobody reads it; older audio is lost
+SPEECH_RATE = 150  # Words per minute, as phrase_cache speaks them
+TAIL_SECONDS = 10.0  # Run time after the last command so its replies and mode switch play out
+SPEECH_LOG = os.path.join("logs", "sim_speech.csv")
+
+
+class SyntheticScene:
+    """
+    Endless generated video with the cv2.VideoCapture interface.
+
+    Boxes of different sizes drift across a textured background and one grows
+    as if approaching, so every stage has work on every frame. Frame n is the
+    same on every run.
+    """
+
+    def __init__(self, size=SCENE_SIZE, fps=SCENE_FPS, objects=SCENE_OBJECTS, seed=0, realtime=True):
+        import cv2
+        self.cv2 = cv2
+        self.fps = fps
+        self.realtime = realtime
+        self.position = 0
+        width, height = size
+        rng = np.random.default_rng(seed)
+        # Smooth blotches over a vertical gradient, like a floor and a wall
+        texture = cv2.resize(rng.integers(0, 80, (height // 40, width // 40, 3), dtype=np.uint8), size,
+                             interpolation=cv2.INTER_CUBIC)
+        gradient = np.linspace(60, 160, height, dtype=np.float32)[:, None, None]
+        self.background = np.clip(gradient + texture, 0, 255).astype(np.uint8)
+        self.objects = [{
+            "color": tuple(int(c) for c in rng.integers(0, 256, 3)),
+            "size": rng.uniform(0.08, 0.3, 2) * size,
+            "start": rng.uniform(0, 1, 2) * size,
+            "velocity": rng.uniform(-0.15, 0.15, 2) * size,  # Pixels per second
+        } for _ in range(objects)]
+        self._pace_start = None
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        """Render the next frame, into `image` if it has the right shape."""
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        np.copyto(image, self.background)
+        height, width = image.shape[:2]
+        t = self.position / self.fps
+        for obj in self.objects:
+            center = (obj["start"] + obj["velocity"] * t) % (width, height)
+            self._box(image, center, obj["size"], obj["color"])
+        # Approaches from a tenth to half the frame height every 6 seconds
+        growth = (t % 6.0) / 6.0
+        side = height * (0.1 + 0.4 * growth)
+        self._box(image, (width * 0.5, height * 0.55), (side * 0.6, side), (40, 40, 200))
+        if self.realtime:
+            self._pace()
+        self.position += 1
+        return True, image
+
+    def _box(self, image, center, size, color):
+        x1, y1 = (np.asarray(center) - np.asarray(size) / 2).astype(int)
+        x2, y2 = (np.asarray(center) + np.asarray(size) / 2).astype(int)
+        self.cv2.rectangle(image, (int(x1), int(y1)), (int(x2), int(y2)), color, -1)
+
+    def _pace(self):
+        now = time.perf_counter()
+        if self._pace_start is None:
+            self._pace_start = (now, self.position)
+            return
+        due = self._pace_start[0] + (self.position - self._pace_start[1]) / self.fps
+        if due > now:
+            time.sleep(due - now)
+
+    def get(self, prop):
+        cv2 = self.cv2
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.background.shape[1])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.background.shape[0])
+        return 0.0
+
+    def set(self, prop, value):
+        """Only frame positions can be set."""
+        if prop != self.cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self.position = int(value)
+        self._pace_start = None
+        return True
+
+    def release(self):
+        pass
+
+
+def load_script(path):
+    """(seconds, wav path) pairs of a command script, in time order."""
+    commands = []
+    directory = os.path.dirname(path)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            seconds, name = line.split(None, 1)
+            commands.append((float(seconds), os.path.join(directory, name.strip())))
+    return sorted(commands)
+
+
+def read_wav(path, sample_rate):
+    """A 16-bit WAV file as mono int16 samples at `sample_rate`."""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: command clips must be 16-bit WAV")
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        count = int(len(samples) * sample_rate / rate)
+        samples = np.interp(np.arange(count) * rate / sample_rate, np.arange(len(samples)), samples)
+    return samples.astype(np.int16)
+
+
+class CommandScript:
+    """The clips of a command script on one timeline, shared by every microphone opened on it."""
+
+    def __init__(self, commands, noise_level=NOISE_LEVEL):
+        self.commands = commands
+        self.noise_level = noise_level
+        self.origin = time.perf_counter()  # Sample 0 of every microphone stream
+        self.offset = None  # Seconds after origin the script started; the microphones hear only noise before
+        self.duration = 0.0  # Seconds until the last clip ends
+        for seconds, path in commands:
+            with wave.open(path, "rb") as wav:
+                self.duration = max(self.duration, seconds + wav.getnframes() / wav.getframerate())
+        self._clips = {}  # Sample rate -> [(seconds, samples)]
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(0)
+
+    def start(self):
+        """Play the clips from now on."""
+        with self._lock:
+            self.offset = time.perf_counter() - self.origin
+        print(f"Command script started ({len(self.commands)} clips over {self.duration:.1f} s)")
+
+    def elapsed(self):
+        """Seconds since the script started, or None before."""
+        if self.offset is None:
+            return None
+        return time.perf_counter() - self.origin - self.offset
+
+    def clips(self, sample_rate):
+        with self._lock:
+            if sample_rate not in self._clips:
+                self._clips[sample_rate] = [(seconds, read_wav(path, sample_rate)) for seconds, path in self.commands]
+            return self._clips[sample_rate]
+
+    def render(self, first, count, sample_rate):
+        """Samples first..first + count after origin at `sample_rate`: the started clips over the noise floor."""
+        with self._lock:
+            noise = self._rng.normal(0.0, self.noise_level, count)
+        if self.offset is None:
+            return noise.astype(np.int16)
+        for seconds, samples in self.clips(sample_rate):
+            start = int((self.offset + seconds) * sample_rate)
+            lo, hi = max(first, start), min(first + count, start + len(samples))
+            if lo < hi:
+                noise[lo - first:hi - first] += samples[lo - start:hi - start]
+        return np.clip(noise, -32768, 32767).astype(np.int16)
+
+
+class ScriptStream:
+    """Reads a CommandScript in real time, like a PyAudio input stream."""
+
+    def __init__(self, script, sample_rate):
+        self.script = script
+        self.sample_rate = sample_rate
+        self.position = int((time.perf_counter() - script.origin) * sample_rate)  # Next sample to return
+
+    def read(self, size, exception_on_overflow=False):
+        due = self.script.origin + (self.position + size) / self.sample_rate
+        late = time.perf_counter() - due
+        if late > MAX_BACKLOG:
+            # Nobody read for a while; like a real input buffer, only the most recent audio is kept
+            self.position += int((late - MAX_BACKLOG) * self.sample_rate)
+        elif late < 0:
+            time.sleep(-late)
+        samples = self.script.render(self.position, size, self.sample_rate)
+        self.position += size
+        return samples.tobytes()
+
+    def close(self):
+        pass
+
+
+class ScriptedMicrophone(sr.AudioSource):
+    """sr.Microphone stand-in that hears the command script."""
+
+    def __init__(self, script, device_index=None, sample_rate=None, chunk_size=1024):
+        self.script = script
+        self.device_index = device_index
+        self.SAMPLE_RATE = sample_rate or MIC_SAMPLE_RATE
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk_size
+        self.stream = None
+
+    def __enter__(self):
+        assert self.stream is None, "This audio source is already inside a context manager"
+        self.stream = ScriptStream(self.script, self.SAMPLE_RATE)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.close()
+        self.stream = None
+
+
+def speech_seconds(text, rate=SPEECH_RATE):
+    """How long saying `text` takes at `rate` words per minute."""
+    return 0.3 + len(text.split()) * 60.0 / rate
+
+
+class RecordingSpeaker:
+    """
+    CachedSpeaker stand-in that records what would be said and when.
+
+    Phrases take as long as they would take to say, so queueing, stale
+    announcements, clear() and alerts behave as with the sound card.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.events = []  # (seconds, event, text)
+        self.queue = queue.Queue()
+        self._cut = threading.Event()  # Set by clear() to cut off the phrase being said
+        self._lock = threading.Lock()
+        self._alert_until = 0.0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def record(self, event, text):
+        """Add an event to the speech log."""
+        with self._lock:
+            self.events.append((round(time.perf_counter() - self.start_time, 3), event, text))
+
+    def say(self, text, expires=None, on_start=None):
+        self.queue.put((text, expires, on_start))
+
+    def clear(self):
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                self.record("dropped", entry[0])
+            else:
+                self.queue.put(None)
+                break
+        self._cut.set()
+
+    def alert(self, sound, text=None, expires=None, on_start=None):
+        pcm, sample_rate = sound
+        self.clear()
+        self.record("alert", text or "")
+        with self._lock:
+            self._alert_until = time.perf_counter() + len(pcm) / sample_rate
+        if text is not None:
+            self.say(text, expires=expires, on_start=on_start)
+
+    def preload(self, phrases=()):
+        pass  # Nothing is synthesized
+
+    def close(self):
+        self.queue.put(None)
+
+    def _run(self):
+        budget.pin_current_thread("audio")
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                break
+            text, expires, on_start = entry
+            if expires is not None and time.perf_counter() > expires:
+                self.record("stale", text)
+                continue
+            with self._lock:
+                delay = self._alert_until - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._cut.clear()
+            self.record("said", text)
+            if on_start is not None:
+                on_start()
+            if self._cut.wait(speech_seconds(text)):
+                self.record("cut off", text)
+
+    def save(self, path=SPEECH_LOG):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock, open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["seconds", "event", "text"])
+            writer.writerows(self.events)
+
+
+class SimulatedEarcons(EarconPlayer):
+    """EarconPlayer whose mixing callback runs on a thread paced like the output stream."""
+
+    def __init__(self, speaker=None):
+        super().__init__()
+        self.speaker = speaker  # Target changes are recorded with the speech
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sim-earcons", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def set_target(self, direction, band=None):
+        changed = ((direction, band) if direction is not None else None) != self.target
+        super().set_target(direction, band)
+        if changed and self.speaker is not None:
+            self.speaker.record("earcon", f"{direction} {band}" if direction is not None else "off")
+
+    def _run(self):
+        budget.pin_current_thread("audio")
+        block = np.zeros((self.block_size, 2), dtype=np.float32)
+        period = self.block_size / self.bank.sample_rate
+        deadline = time.perf_counter()
+        while self._running:
+            self._callback(block, self.block_size, None, None)
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+
+class Simulation:
+    """Stand-ins for every device caller.py uses, around one command script."""
+
+    def __init__(self, script_path, video=None, seconds=None, speech_log=SPEECH_LOG):
+        self.script = CommandScript(load_script(script_path))
+        self.video = video or SYNTHETIC_SOURCE
+        self.seconds = seconds or self.script.duration + TAIL_SECONDS
+        self.speech_log = speech_log
+        self.speaker = RecordingSpeaker()
+
+    @classmethod
+    def from_environment(cls):
+        """The simulation configured by SIM_COMMANDS, SIM_VIDEO and SIM_SECONDS, or None."""
+        script = os.environ.get("SIM_COMMANDS")
+        if not script:
+            return None
+        seconds = os.environ.get("SIM_SECONDS")
+        return cls(script, os.environ.get("SIM_VIDEO"), float(seconds) if seconds else None)
+
+    def microphone(self, device_index=None, sample_rate=None, chunk_size=1024):
+        return ScriptedMicrophone(self.script, device_index, sample_rate, chunk_size)
+
+    def earcons(self):
+        return SimulatedEarcons(self.speaker)
+
+    def start(self):
+        """Start the command script; called once the system is ready."""
+        self.script.start()
+
+    def finished(self):
+        """True once the script has played and the run time is over."""
+        elapsed = self.script.elapsed()
+        return elapsed is not None and elapsed >= self.seconds
+
+    def report(self):
+        self.speaker.save(self.speech_log)
+        counts = {}
+        for _, event, _ in self.speaker.events:
+            counts[event] = counts.get(event, 0) + 1
+        summary = ", ".join(f"{count} {event}" for event, count in sorted(counts.items()))
+        print(f"Simulated speech: {summary or 'nothing'} (written to {self.speech_log})")
@@ -0,0 +1,57 @@
+"""
+Startup timing and parallel loading for the launchers.
+
+A launcher says "Starting" before anything heavy is imported, then loads the
+detection stack (torch, ultralytics, OpenCV, weights, camera, warm-up inference)
+and the voice stack (speech recognition, recognizer backend, microphone) at the
+same time, says "Ready" and prints how long each stage took.
+"""
+import contextlib
+import threading
+import time
+
+
+class StartupTimer:
+    """Records when each startup stage started and finished, including parallel ones."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter() - self.t0
+        try:
+            yield
+        finally:
+            end = time.perf_counter() - self.t0
+            with self._lock:
+                self.stages.append((name, start, end, threading.current_thread().name))
+
+    def report(self):
+        """Print the startup breakdown, ordered by start time."""
+        total = time.perf_counter() - self.t0
+        print("Startup breakdown:")
+        for name, start, end, thread in sorted(self.stages, key=lambda s: s[1]):
+            print(f"  {start:6.2f} - {end:6.2f} s  {end - start:6.2f} s  {name} [{thread}]")
+        print(f"Ready after {total:.2f} s")
+
+
+def run_in_parallel(*functions):
+    """Run each function on its own thread, wait for all, and re-raise the first failure."""
+    errors = []
+
+    def run(function):
+        try:
+            function()
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(f,), name=f.__name__, daemon=True) for f in functions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
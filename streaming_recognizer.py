@@ -0,0 +1,161 @@
+"""
+Streaming command recognition with partial results.
+
+recognizer.listen() only returns once the phrase is followed by enough silence
+(or the phrase time limit is hit), and recognition starts after that. Here the
+microphone is read chunk by chunk and every chunk is fed straight into a
+pocketsphinx decoder. After each chunk the partial hypothesis is checked, and
+the command is returned as soon as it is unambiguous, e.g. right after "normal
+mode on" is complete, without waiting for trailing silence. Only a complete
+command phrase that two consecutive partial hypotheses agree on ends the
+utterance early, so a spurious spot in one partial cannot cut it short. When
+the backend spots object names, "find mode on" may still be followed by one:
+if the speaker falls silent right after the command, it is returned on its
+own after a short OBJECT_WAIT_SECONDS; if speech goes on, the listener waits
+for the end of speech and then looks for the object in the utterance's audio.
+"""
+import collections
+import time
+import numpy as np
+import speech_recognition as sr
+from recognizer_backends import COMMAND_PHRASES, FIND_COMMAND, SPHINX_SAMPLE_RATE
+from voice_activity import vad as default_vad
+
+PREROLL_SECONDS = 0.3  # Audio kept from before speech onset so the first word is not clipped
+END_SILENCE_SECONDS = 0.3  # Trailing silence that ends an utterance with no command in it
+OBJECT_WAIT_SECONDS = 0.2  # Silence after "find mode on" that means no object name follows
+OBJECT_MIN_SECONDS = 0.1  # Speech after "find mode on" that is an object name rather than the command's tail
+
+
+class StreamingCommandListener:
+    """Feed microphone audio into an incremental decoder and resolve commands early."""
+
+    def __init__(self, backend, vad=None, phrases=None):
+        self.backend = backend
+        self.decoder = backend.create_decoder()
+        self.vad = vad or default_vad
+        self.phrases = list(phrases or COMMAND_PHRASES)
+        self.objects = bool(getattr(backend, "objects", None))
+        # Commands that are the beginning of a longer command are only final at end of speech
+        self._extensions = {p: [q for q in self.phrases if q != p and q.startswith(p + " ")]
+                            for p in self.phrases}
+        if self.objects and FIND_COMMAND in self._extensions:
+            self._extensions[FIND_COMMAND].append(FIND_COMMAND + " <object>")
+        self.last_latency = None  # Seconds from the last voiced chunk to an early-resolved command, else None
+
+    def resolve(self, text):
+        """Return the command in a partial hypothesis once it can no longer change."""
+        for phrase in self.phrases:
+            if phrase in COMMAND_PHRASES and phrase in text and not self._extensions[phrase]:
+                return phrase
+        return None
+
+    def _to_decoder_rate(self, samples, sample_rate):
+        if sample_rate == SPHINX_SAMPLE_RATE:
+            return samples
+        n_out = int(len(samples) * SPHINX_SAMPLE_RATE / sample_rate)
+        positions = np.linspace(0, len(samples) - 1, n_out)
+        return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+    def listen(self, source, timeout=None, phrase_time_limit=None, on_partial=None):
+        """
+        Listen on an open sr.Microphone and return the recognized text.
+
+        Raises sr.WaitTimeoutError if no speech starts within `timeout` seconds and
+        sr.UnknownValueError if the utterance does not contain anything recognizable.
+        `on_partial` is called with every new partial hypothesis.
+        """
+        assert source.stream is not None, "Audio source must be entered before listening"
+        assert source.SAMPLE_WIDTH == 2, "Streaming recognition expects 16-bit audio"
+        chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+        self.last_latency = None
+        preroll = collections.deque(maxlen=max(1, int(PREROLL_SECONDS / chunk_seconds)))
+
+        started = False
+        waited = 0.0
+        spoken = 0.0
+        silence = 0.0
+        last_voiced = None
+        text = ""
+        resolved = None  # Command the previous partial hypothesis resolved to
+        after_find = None  # Seconds of speech since "find mode on" showed up in the partial hypothesis
+        utterance = []  # Decoder-rate audio of the utterance, for the object search
+        try:
+            while True:
+                raw = source.stream.read(source.CHUNK)
+                if len(raw) == 0:
+                    break
+                samples = self._to_decoder_rate(np.frombuffer(raw, dtype=np.int16), source.SAMPLE_RATE)
+                flags, _, _ = self.vad.frame_flags(samples, SPHINX_SAMPLE_RATE)
+                voiced = bool(flags.any())
+
+                if not started:
+                    preroll.append(samples)
+                    if not voiced:
+                        waited += chunk_seconds
+                        if timeout and waited > timeout:
+                            raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+                        continue
+                    # Speech onset: start the utterance with the buffered lead-in
+                    started = True
+                    self.decoder.start_utt()
+                    for buffered in preroll:
+                        self.decoder.process_raw(buffered.tobytes(), False, False)
+                    utterance.extend(preroll)
+                else:
+                    self.decoder.process_raw(samples.tobytes(), False, False)
+                    utterance.append(samples)
+
+                spoken += chunk_seconds
+                if voiced:
+                    silence = 0.0
+                    last_voiced = time.perf_counter()
+                else:
+                    silence += chunk_seconds
+
+                hyp = self.decoder.hyp()
+                partial = hyp.hypstr.strip().lower() if hyp is not None else ""
+                if partial and partial != text:
+                    text = partial
+                    if on_partial:
+                        on_partial(text)
+                command = self.resolve(partial) if partial else None
+                if command is not None and command == resolved:
+                    # The command survived one more chunk of audio: it is final
+                    self.last_latency = time.perf_counter() - last_voiced
+                    return text
+                resolved = command
+                if self.objects and FIND_COMMAND in partial:
+                    if after_find is None:
+                        after_find = 0.0
+                    elif voiced:
+                        after_find += chunk_seconds
+                    if after_find < OBJECT_MIN_SECONDS and silence >= OBJECT_WAIT_SECONDS:
+                        # No object name follows: the bare command is final
+                        self.last_latency = time.perf_counter() - last_voiced
+                        return text
+
+                if silence >= END_SILENCE_SECONDS:
+                    break
+                if phrase_time_limit and spoken > phrase_time_limit:
+                    break
+        finally:
+            if started:
+                self.decoder.end_utt()
+
+        hyp = self.decoder.hyp() if started else None
+        if hyp is not None and hyp.hypstr.strip():
+            text = hyp.hypstr.strip().lower()
+        if self.objects and FIND_COMMAND in text:
+            raw = b"".join(samples.tobytes() for samples in utterance)
+            text = f"{text} {self.backend.spot_objects(self.decoder, raw)}".strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+def create_streaming_listener(backend):
+    """Return a streaming listener for `backend`, or None if it cannot decode incrementally."""
+    if not hasattr(backend, "create_decoder"):
+        return None
+    return StreamingCommandListener(backend, phrases=backend.phrases)
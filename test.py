@@ -1,11 +1,11 @@
 import cv2
+import numpy as np
 from ultralytics import YOLO
 from screeninfo import get_monitors
-import pyttsx3  # Import the pyttsx3 library for text-to-speech
-
-# Initialize the text-to-speech engine
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)  # Adjust the speech rate (words per minute)
+from phrase_cache import speaker  # Cached text-to-speech; each message is synthesized only once
+from detection_log import DetectionLog
+from tracker import IoUTracker, announcements
+from detector import draw_detections
 
 # Load the pre-trained YOLOv8 model (e.g., YOLOv8l - large version)
 model = YOLO('yolov8l.pt')  # You can choose 'yolov8n.pt', 'yolov8s.pt', etc.
@@ -32,12 +32,19 @@ cv2.resizeWindow('YOLOv8 Real-Time Detection', screen_width, screen_height)
 # Set the confidence threshold
 CONFIDENCE_THRESHOLD = 0.7  # Adjust this value as needed
 
-# Initialize a set to keep track of detected objects
-detected_objects = set()
+# Record detections and announcements for later review (python detection_log.py logs)
+detection_log = DetectionLog("logs")
+
+# Track objects across frames so each one is announced once, not once per class
+tracker = IoUTracker()
+
+# Frame buffers reused on every iteration instead of allocating new arrays per frame
+frame = None
+frame_resized = np.empty((screen_height, screen_width, 3), dtype=np.uint8)
 
 while True:
-    # Capture frame-by-frame from the camera
-    ret, frame = cap.read()
+    # Capture frame-by-frame from the camera, into the previous frame's buffer
+    ret, frame = cap.read(frame)
     if not ret:
         print("Can't receive frame (stream end?). Exiting ...")
         break
@@ -45,37 +52,25 @@ while True:
     # Perform object detection with the confidence threshold
     results = model(frame, conf=CONFIDENCE_THRESHOLD)
 
-    # Visualize the results on the frame
-    annotated_frame = results[0].plot()
+    # Log this frame's detections
+    boxes = results[0].boxes
+    detection_log.log_frame(boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy(), boxes.conf.cpu().numpy())
+
+    # Visualize the results on the frame itself (plot() would draw on a copy)
+    detections = boxes.data.cpu().numpy()[:, :6]
+    draw_detections(frame, detections, model.names)
 
     # Resize the frame to fit the screen resolution
-    frame_resized = cv2.resize(annotated_frame, (screen_width, screen_height))
+    cv2.resize(frame, (screen_width, screen_height), dst=frame_resized)
 
     # Display the resulting frame
     cv2.imshow('YOLOv8 Real-Time Detection', frame_resized)
 
-    # Process detections and announce detected objects
-    for result in results:
-        for box in result.boxes:
-            cls_id = int(box.cls[0])
-            class_name = model.names[cls_id]
-            confidence = box.conf[0]
-
-            # Capitalize the first letter of the class name
-            class_name_formatted = class_name.capitalize()
-
-            # Check if the object has already been announced
-            if class_name not in detected_objects:
-                detected_objects.add(class_name)
-                # Prepare and say the message
-                message = f"{class_name_formatted} detected"
-                print(message)  # Optional: Print the message to the console
-                engine.say(message)
-                engine.runAndWait()
-
-    # Clear the set if no objects are detected to allow re-announcement
-    if len(results[0].boxes) == 0:
-        detected_objects.clear()
+    # Announce objects that just appeared or moved or came much closer
+    for message, cls_id in announcements(tracker.update(detections), model.names, frame.shape[1]):
+        print(message)  # Optional: Print the message to the console
+        speaker.say(message)
+        detection_log.log_announcement(message, cls_id)
 
     # Press 'q' to exit the video stream
     if cv2.waitKey(1) == ord('q'):
@@ -84,3 +79,4 @@ while True:
 # When everything is done, release the capture and close windows
 cap.release()
 cv2.destroyAllWindows()
+detection_log.close()
@@ -1,7 +1,13 @@
+"""Print the hardware capability report; see capability_probe.py to benchmark and cache a backend."""
 import sys
-import torch
-import cv2
+from capability_probe import probe_hardware
+
+hardware = probe_hardware()
 print("Python Version:", sys.version)
-print("CUDA Available:", torch.cuda.is_available())
-print("GPU Name:", torch.cuda.get_device_name(0) if torch.cuda.is_available() else "No GPU")
-print("CUDA Device Count (OpenCV):", cv2.cuda.getCudaEnabledDeviceCount())
\ No newline at end of file
+print("CUDA Available:", hardware["cuda"] is not None)
+print("GPU Name:", hardware["cuda"] or "No GPU")
+print("CUDA Device Count (OpenCV):", hardware["opencv_cuda_devices"])
+print("CPU:", hardware["cpu"])
+print("Instruction Sets:", ", ".join(hardware["instruction_sets"]) or "none of interest")
+print(f"Cores: {hardware['physical_cores']} physical, {hardware['logical_cores']} logical")
+print(f"Memory: {hardware['memory_gb']} GB")
@@ -0,0 +1,33 @@
+"""
+Tests for the Find-mode vocabulary.
+
+Usage:
+    python -m pytest test_object_vocabulary.py
+"""
+from object_vocabulary import load_vocabulary
+
+vocabulary = load_vocabulary()
+
+
+def test_exact_synonym_and_plural():
+    assert vocabulary.resolve("find my mug") == "cup"
+    assert vocabulary.resolve("where are the chairs") == "chair"
+
+
+def test_spelled_out_letters():
+    assert vocabulary.resolve("find the tee vee") == "tv"
+
+
+def test_sound_alike():
+    assert vocabulary.resolve("find a cheer") == "chair"
+
+
+def test_misspelling():
+    assert vocabulary.resolve("find the refridgerator") == "refrigerator"
+
+
+def test_no_false_positives():
+    # Short words that share a sound-alike key with a class but are not that object
+    assert vocabulary.resolve("go back") is None
+    assert vocabulary.resolve("find the tee vee") != "tie"
+    assert vocabulary.resolve("hello system") is None
@@ -0,0 +1,112 @@
+"""
+Tests for early command resolution in the streaming listener, with a scripted decoder.
+
+Usage:
+    python -m pytest test_streaming_recognizer.py
+"""
+import types
+import numpy as np
+from streaming_recognizer import StreamingCommandListener
+
+CHUNK = 512
+
+
+class ScriptedDecoder:
+    """Returns the next scripted partial hypothesis after each chunk."""
+
+    def __init__(self, partials):
+        self.partials = list(partials)
+        self.chunks = 0
+
+    def start_utt(self):
+        pass
+
+    def end_utt(self):
+        pass
+
+    def process_raw(self, raw, no_search, full_utt):
+        self.chunks += 1
+
+    def hyp(self):
+        index = min(self.chunks, len(self.partials)) - 1
+        text = self.partials[index] if index >= 0 else ""
+        return types.SimpleNamespace(hypstr=text) if text else None
+
+
+class Backend:
+    phrases = ["hello system", "find mode on", "normal mode on"]
+
+    def __init__(self, partials, objects=()):
+        self.partials = partials
+        self.objects = list(objects)
+        self.spotted = None
+
+    def create_decoder(self):
+        return ScriptedDecoder(self.partials)
+
+    def spot_objects(self, decoder, raw):
+        return self.spotted or ""
+
+
+class VoicedVad:
+    """Every chunk is speech for the first `voiced` chunks."""
+
+    def __init__(self, voiced):
+        self.voiced = voiced
+        self.seen = 0
+
+    def frame_flags(self, samples, sample_rate):
+        self.seen += 1
+        return np.array([self.seen <= self.voiced]), None, None
+
+
+class Source:
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2
+    CHUNK = CHUNK
+
+    def __init__(self):
+        self.stream = self
+        self.reads = 0
+
+    def read(self, size):
+        self.reads += 1
+        return np.zeros(size, dtype=np.int16).tobytes()
+
+
+def listen(backend, voiced=40):
+    listener = StreamingCommandListener(backend, vad=VoicedVad(voiced), phrases=backend.phrases)
+    source = Source()
+    return listener.listen(source, timeout=1, phrase_time_limit=5), source.reads, listener
+
+
+def test_command_resolves_after_one_stable_partial():
+    text, reads, listener = listen(Backend(["normal", "normal mode", "normal mode on"]))
+    assert text == "normal mode on"
+    assert reads == 4  # One chunk after the command first appeared
+    assert listener.last_latency is not None
+
+
+def test_object_name_in_partial_does_not_end_utterance():
+    # A spurious object spot must not cut "find mode on" short
+    backend = Backend(["chair", "find", "find mode", "find mode on"], objects=["chair"])
+    backend.spotted = "chair"
+    text, reads, listener = listen(backend, voiced=10)
+    assert text == "find mode on chair"
+    assert reads > 10  # Waited for the end of speech
+    assert listener.last_latency is None  # Not resolved early
+
+
+def test_bare_find_command_resolves_early():
+    # No object name follows, so the command does not wait for the full end of speech
+    backend = Backend(["find", "find mode", "find mode on"], objects=["chair"])
+    text, reads, listener = listen(backend, voiced=3)
+    assert text == "find mode on"
+    assert reads < 3 + 10  # 0.3 s of end silence would take 10 chunks
+    assert listener.last_latency is not None
+
+
+def test_flickering_command_is_not_final():
+    text, reads, _ = listen(Backend(["hello system", "hello", "hello system", "hello system"]))
+    assert text == "hello system"
+    assert reads == 4
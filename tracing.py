@@ -0,0 +1,106 @@
+"""
+Latency tracing of voice interactions in Chrome trace format.
+
+Every interaction handled by handle_command() gets its own row in the trace,
+with spans for recognition and intent matching, and instants for the end of
+the wake-word audio, the recognition result, the mode switch, and when a
+reply was enqueued and when it became audible. Open the file in
+chrome://tracing or https://ui.perfetto.dev.
+
+The file uses the JSON array format, whose closing bracket is optional, so
+events are appended as they happen and a crash never leaves it unreadable.
+"""
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+
+TRACE_FILE = os.path.join("logs", "interaction_trace.json")
+
+
+class InteractionTracer:
+    """Appends interaction events to a Chrome trace file."""
+
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        self.t0 = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def now_us(self):
+        return (time.perf_counter() - self.t0) * 1e6
+
+    def write(self, events):
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "w", encoding="utf-8")
+                self._file.write("[\n")
+            for event in events:
+                self._file.write(json.dumps(event) + ",\n")
+            self._file.flush()
+
+    def begin(self, name="interaction"):
+        return Interaction(self, next(self._ids), name)
+
+
+class Interaction:
+    """Events of one interaction, written when it ends (or dropped if cancelled)."""
+
+    def __init__(self, tracer, interaction_id, name):
+        self.tracer = tracer
+        self.id = interaction_id
+        self.name = name
+        self.start = tracer.now_us()
+        self.events = []
+        self.finished = False
+        self.cancelled = False
+
+    def _event(self, name, phase, ts, **fields):
+        event = {"name": name, "ph": phase, "ts": ts, "pid": 1, "tid": self.id, **fields}
+        if self.cancelled:
+            return
+        if self.finished:
+            self.tracer.write([event])  # Late events, e.g. a reply that became audible after the interaction
+        else:
+            self.events.append(event)
+
+    def mark(self, name, **args):
+        """Instant event."""
+        self._event(name, "i", self.tracer.now_us(), s="t", args=args)
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        start = self.tracer.now_us()
+        try:
+            yield
+        finally:
+            self._event(name, "X", start, dur=self.tracer.now_us() - start, args=args)
+
+    def reply(self, speaker, text):
+        """Queue a spoken reply, tracing when it was enqueued and when it started playing."""
+        self.mark("reply enqueued", text=text)
+        speaker.say(text, on_start=lambda: self.mark("reply audible", text=text))
+
+    def end(self, **args):
+        """Write the interaction with an overall span named after it."""
+        if self.cancelled or self.finished:
+            return
+        self._event(self.name, "X", self.start, dur=self.tracer.now_us() - self.start, args=args)
+        thread_name = {"name": "thread_name", "ph": "M", "pid": 1, "tid": self.id,
+                       "args": {"name": f"Interaction {self.id}"}}
+        self.finished = True
+        self.tracer.write([thread_name] + self.events)
+        self.events = []
+
+    def cancel(self):
+        """Drop the interaction, e.g. when it turned out to be background noise."""
+        self.cancelled = True
+        self.events = []
+
+
+# Shared by the launchers
+tracer = InteractionTracer()
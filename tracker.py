@@ -0,0 +1,161 @@
+"""
+Multi-object tracking and track-based announcements.
+
+Announcing by class name treats three people as one "Person detected" and
+announces the same chair again whenever it drops out of a single frame.
+IoUTracker gives every object a persistent ID: detections are matched to the
+predicted boxes of existing tracks by overlap, a track survives a few frames
+without a match, and it is only reported once it has been seen in several
+frames. announcements() then speaks about a track when it first appears and
+again only when it changes a lot (moves to another side, or comes much
+closer).
+"""
+import numpy as np
+
+IOU_THRESHOLD = 0.3  # Minimum overlap between a track's predicted box and a detection
+MAX_MISSED = 15  # Frames a track survives without a matching detection
+MIN_HITS = 3  # Frames a track must be seen before it is reported
+APPROACH_RATIO = 1.8  # Box area growth since the last announcement that counts as "getting closer"
+VELOCITY_SMOOTHING = 0.5  # Weight of the newest box displacement in the velocity estimate
+
+
+def direction_of(box, frame_width):
+    """'on your left', 'ahead' or 'on your right' from the box centre."""
+    centre = (box[0] + box[2]) / 2 / frame_width
+    if centre < 1 / 3:
+        return "on your left"
+    if centre > 2 / 3:
+        return "on your right"
+    return "ahead"
+
+
+def box_area(boxes):
+    return np.maximum(boxes[..., 2] - boxes[..., 0], 0) * np.maximum(boxes[..., 3] - boxes[..., 1], 0)
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of (n, 4) and (m, 4) x1, y1, x2, y2 boxes."""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    union = box_area(a)[:, None] + box_area(b)[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+class Track:
+    """One tracked object."""
+
+    __slots__ = ("id", "cls", "box", "conf", "velocity", "hits", "missed",
+                 "announced_direction", "announced_area")
+
+    def __init__(self, track_id, detection):
+        self.id = track_id
+        self.cls = int(detection[5])
+        self.box = detection[:4].copy()
+        self.conf = float(detection[4])
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.hits = 1
+        self.missed = 0
+        self.announced_direction = None  # None until the track has been announced
+        self.announced_area = 0.0
+
+    def predicted_box(self):
+        """Where the box should be this frame if the object keeps moving the same way."""
+        return self.box + self.velocity * (self.missed + 1)
+
+    def update(self, detection):
+        box = detection[:4]
+        displacement = (box - self.box) / (self.missed + 1)
+        self.velocity = VELOCITY_SMOOTHING * displacement + (1 - VELOCITY_SMOOTHING) * self.velocity
+        self.box = box.copy()
+        self.conf = float(detection[4])
+        self.hits += 1
+        self.missed = 0
+
+
+class IoUTracker:
+    """Greedy IoU matching of detections to tracks with persistent IDs."""
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_missed=MAX_MISSED, min_hits=MIN_HITS):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, detections):
+        """
+        Match an (n, 6) detection array to the tracks.
+
+        Returns the confirmed tracks that were detected in this frame.
+        """
+        unmatched = set(range(len(detections)))
+        matched = set()
+        if self.tracks and len(detections):
+            predicted = np.array([t.predicted_box() for t in self.tracks], dtype=np.float32)
+            iou = iou_matrix(predicted, detections[:, :4])
+            # Objects never change class
+            iou[np.array([t.cls for t in self.tracks])[:, None] != detections[None, :, 5].astype(int)] = 0
+            # Best overlaps first; each track and detection is used at most once
+            while True:
+                t, d = np.unravel_index(iou.argmax(), iou.shape)
+                if iou[t, d] < self.iou_threshold:
+                    break
+                self.tracks[t].update(detections[d])
+                matched.add(t)
+                unmatched.discard(d)
+                iou[t, :] = 0
+                iou[:, d] = 0
+
+        for i, track in enumerate(self.tracks):
+            if i not in matched:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        for d in sorted(unmatched):
+            self.tracks.append(Track(self._next_id, detections[d]))
+            self._next_id += 1
+        return [t for t in self.tracks if t.missed == 0 and t.hits >= self.min_hits]
+
+    def reset(self):
+        self.tracks = []
+
+
+def mark_announced(track, frame_width, box=None):
+    """Remember where `track` was, or `box` if given, when it was last announced."""
+    box = track.box if box is None else box
+    track.announced_direction = direction_of(box, frame_width)
+    track.announced_area = float(box_area(box))
+
+
+def pending_announcements(tracks, names, frame_width, ttc=None):
+    """
+    Messages worth speaking about `tracks`, as (message, class id, track) triples.
+
+    A track is announced when it first shows up, and again only when it moves
+    to another side or its box grows by APPROACH_RATIO since it was last announced.
+    With the tracks' times to collision in `ttc`, the soonest reached come first.
+    Nothing is marked as announced; call mark_announced() once a message is spoken.
+    """
+    if ttc is not None:
+        tracks = [tracks[i] for i in np.argsort(ttc, kind="stable")]
+    messages = []
+    for track in tracks:
+        name = names[track.cls].capitalize()
+        direction = direction_of(track.box, frame_width)
+        area = float(box_area(track.box))
+        if track.announced_direction is None:
+            messages.append((f"{name} {direction}", track.cls, track))
+        elif area >= track.announced_area * APPROACH_RATIO:
+            messages.append((f"{name} getting closer, {direction}", track.cls, track))
+        elif direction != track.announced_direction:
+            messages.append((f"{name} now {direction}", track.cls, track))
+    return messages
+
+
+def announcements(tracks, names, frame_width, ttc=None):
+    """Like pending_announcements(), as (message, class id) pairs, marking every track as announced."""
+    messages = []
+    for message, cls, track in pending_announcements(tracks, names, frame_width, ttc):
+        mark_announced(track, frame_width)
+        messages.append((message, cls))
+    return messages
@@ -1,22 +1,160 @@
-import ultralytics
-from ultralytics import YOLO
+"""
+Train (or resume training of) the housing-object detector.
 
-# Parameters for training
-DATA_YAML = r'D:\Ashutosh\blind\project\Housing Data.v2-version-2.yolov8\data.yaml'  # Replace with your dataset.yaml path
+Usage:
+    python train.py --data "path/to/Housing Data.v2-version-2.yolov8/data.yaml"
+    python train.py --data data.yaml --cache disk --workers 4 --threads 12
+    python train.py --resume                       # continue the most recent run
+    python train.py --resume runs/housing/train/weights/last.pt
+
+    # Decode and letterbox the dataset once, then train from memory-mapped arrays
+    python mmap_dataset.py --data data.yaml --out cache/housing --imgsz 640
+    python train.py --data cache/housing/data.yaml
+
+    # Distil yolov8l into the nano model (teacher outputs are computed once and cached)
+    python train.py --data data.yaml --model yolov8n.pt --teacher yolov8l.pt
+
+On CPU build servers the dataset is cached (decoded images in RAM by default),
+dataloader workers and torch threads split the available cores between them,
+training stops early once validation mAP stops improving, and every epoch logs
+its training throughput in images per second.
+"""
+import argparse
+import glob
+import os
+import time
+
+# Defaults for training
+DATA_YAML = os.environ.get("HOUSING_DATA_YAML")  # Path to the dataset's data.yaml
 MODEL_NAME = 'yolov8n.pt'  # YOLOv8 pre-trained model name (e.g. yolov8n.pt)
-EPOCHS = 100  # Number of training epochs
+EPOCHS = 100  # Maximum number of training epochs
 BATCH_SIZE = 16  # Batch size for training
 IMG_SIZE = 640  # Image size for training
-DEVICE = 'cpu'  # Device to use for training (e.g. "cpu" or "0" for GPU)
-
-# Load the model (YOLOv8)
-model = YOLO(MODEL_NAME)
-
-# Train the model
-model.train(
-    data=DATA_YAML,
-    epochs=EPOCHS,
-    batch=BATCH_SIZE,
-    imgsz=IMG_SIZE,
-    device=DEVICE
-)
+PATIENCE = 20  # Stop after this many epochs without validation improvement
+PROJECT = 'runs/housing'  # Directory that holds the training runs
+
+
+def available_cores():
+    """Number of CPU cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def split_cores(cores, workers=None, threads=None):
+    """Share cores between dataloader workers (image decoding) and torch compute threads."""
+    if workers is None:
+        workers = max(1, cores // 4)
+    if threads is None:
+        threads = max(1, cores - workers)
+    return workers, threads
+
+
+def latest_checkpoint(project):
+    """Most recently written last.pt under `project`, or None."""
+    checkpoints = glob.glob(os.path.join(project, "**", "weights", "last.pt"), recursive=True)
+    return max(checkpoints, key=os.path.getmtime) if checkpoints else None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the YOLOv8 housing-object detector.")
+    parser.add_argument("--data", default=DATA_YAML, help="Dataset data.yaml (or set HOUSING_DATA_YAML)")
+    parser.add_argument("--model", default=MODEL_NAME, help="Pre-trained weights to start from")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    parser.add_argument("--device", default=None, help='"cpu", "0" for the first GPU; default: GPU if available')
+    parser.add_argument("--cache", choices=["ram", "disk", "none"], default="ram",
+                        help="Cache decoded images in RAM or as .npy files next to the images")
+    parser.add_argument("--workers", type=int, default=None, help="Dataloader worker processes")
+    parser.add_argument("--threads", type=int, default=None, help="Torch intra-op threads")
+    parser.add_argument("--patience", type=int, default=PATIENCE, help="Early-stopping patience in epochs")
+    parser.add_argument("--project", default=PROJECT)
+    parser.add_argument("--name", default="train")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None,
+                        help="Resume from a last.pt checkpoint (default: the most recent run)")
+    parser.add_argument("--teacher", default=None,
+                        help="Distil from these weights (e.g. yolov8l.pt); pass again when resuming")
+    parser.add_argument("--teacher-conf", type=float, default=None, help="Teacher confidence used as a label")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workers, threads = split_cores(available_cores(), args.workers, args.threads)
+
+    # Thread pools read these when torch is first imported
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(var, str(threads))
+
+    import torch
+    from ultralytics import YOLO
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    from mmap_dataset import MemmapDetectionTrainer, is_memmap_dataset
+    from distill import TEACHER_CONF, distillation_trainer
+
+    torch.set_num_threads(threads)
+    device = args.device or ("0" if torch.cuda.is_available() else "cpu")
+    print(f"Training on {device} with {threads} torch threads and {workers} dataloader workers")
+
+    epoch_start = {}
+
+    def restore_workers(trainer):
+        # Ultralytics drops to 0 workers on CPU, which leaves JPEG decoding in the training loop
+        trainer.args.workers = workers
+
+    def start_epoch_timer(trainer):
+        epoch_start["time"] = time.perf_counter()
+
+    def log_throughput(trainer):
+        elapsed = time.perf_counter() - epoch_start["time"]
+        images = len(trainer.train_loader.dataset)
+        print(f"Epoch {trainer.epoch + 1}/{trainer.epochs}: {images / elapsed:.1f} images/s "
+              f"({images} images in {elapsed:.0f} s)")
+
+    if args.resume:
+        checkpoint = latest_checkpoint(args.project) if args.resume == "latest" else args.resume
+        if checkpoint is None:
+            raise SystemExit(f"No checkpoint to resume under {args.project}")
+        print(f"Resuming from {checkpoint}")
+        model = YOLO(checkpoint)
+        train_args = dict(resume=True, device=device, workers=workers)
+        data = model.ckpt.get("train_args", {}).get("data")
+    else:
+        if not args.data:
+            raise SystemExit("Pass --data path/to/data.yaml or set HOUSING_DATA_YAML")
+        model = YOLO(args.model)
+        data = args.data
+        train_args = dict(
+            data=args.data,
+            epochs=args.epochs,
+            batch=args.batch,
+            imgsz=args.imgsz,
+            device=device,
+            cache=False if args.cache == "none" else args.cache,
+            workers=workers,
+            patience=args.patience,
+            project=args.project,
+            name=args.name,
+        )
+
+    if is_memmap_dataset(data):
+        # Preprocessed by mmap_dataset.py: images are already decoded, so nothing to cache
+        train_args.update(trainer=MemmapDetectionTrainer, cache=False)
+
+    if args.teacher:
+        conf = args.teacher_conf if args.teacher_conf is not None else TEACHER_CONF
+        print(f"Distilling {args.teacher} into the student (teacher labels at confidence {conf})")
+        train_args["trainer"] = distillation_trainer(train_args.get("trainer", DetectionTrainer), args.teacher,
+                                                     conf, device)
+
+    model.add_callback("on_pretrain_routine_start", restore_workers)
+    model.add_callback("on_train_epoch_start", start_epoch_timer)
+    model.add_callback("on_train_epoch_end", log_throughput)
+
+    # Train the model
+    model.train(**train_args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Time-to-collision of every tracked object, estimated from how fast its box grows.
+
+For an object approaching at constant speed, the time until it reaches the
+camera is its apparent size divided by the rate the size grows, i.e.
+1 / (d ln(scale) / dt), where scale is the square root of the box area. No
+depth or camera calibration is needed.
+
+TTCEstimator keeps the last WINDOW (time, log scale) samples of every track
+in one fixed-size ring-buffer array, and fits the slope of log scale over
+time for all tracks at once with masked least squares, so the per-frame cost
+is a handful of NumPy operations whatever the number of tracks, and nothing
+grows per frame.
+"""
+import numpy as np
+from tracker import box_area
+
+WINDOW = 10  # Samples per track the slope is fitted over
+MIN_SAMPLES = 3  # Samples needed before a track gets an estimate
+CAPACITY = 64  # Tracks with history; grows if more are alive at once
+FORGET_SECONDS = 1.0  # History of a track unseen this long is dropped
+
+
+class TTCEstimator:
+    """Per-track scale history and batched time-to-collision estimates."""
+
+    def __init__(self, window=WINDOW, capacity=CAPACITY):
+        self.window = window
+        self.log_scale = np.zeros((capacity, window))
+        self.times = np.zeros((capacity, window))
+        self.counts = np.zeros(capacity, dtype=np.int64)  # Valid samples per row
+        self.heads = np.zeros(capacity, dtype=np.int64)  # Column the next sample goes to
+        self.last_seen = np.full(capacity, -np.inf)
+        self.owner = np.full(capacity, -1, dtype=np.int64)  # Track id of each row, -1 if free
+        self._rows = {}  # Track id -> row
+
+    def _grow(self):
+        capacity = len(self.counts)
+        self.log_scale = np.concatenate([self.log_scale, np.zeros_like(self.log_scale)])
+        self.times = np.concatenate([self.times, np.zeros_like(self.times)])
+        self.counts = np.concatenate([self.counts, np.zeros(capacity, dtype=np.int64)])
+        self.heads = np.concatenate([self.heads, np.zeros(capacity, dtype=np.int64)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(capacity, -np.inf)])
+        self.owner = np.concatenate([self.owner, np.full(capacity, -1, dtype=np.int64)])
+
+    def _row_of(self, track_id):
+        row = self._rows.get(track_id)
+        if row is None:
+            free = np.flatnonzero(self.owner < 0)
+            if len(free) == 0:
+                self._grow()
+                free = np.flatnonzero(self.owner < 0)
+            row = int(free[0])
+            self.owner[row] = track_id
+            self.counts[row] = 0
+            self.heads[row] = 0
+            self._rows[track_id] = row
+        return row
+
+    def update(self, tracks, now):
+        """
+        Add this frame's boxes of `tracks` and return their time-to-collision in seconds.
+
+        The result is aligned with `tracks`; objects that are not approaching,
+        or have too little history, get infinity.
+        """
+        # Rows of tracks gone for a while are freed for new tracks
+        stale = (self.owner >= 0) & (now - self.last_seen > FORGET_SECONDS)
+        for track_id in self.owner[stale].tolist():
+            del self._rows[track_id]
+        self.owner[stale] = -1
+
+        if not tracks:
+            return np.zeros(0)
+        rows = np.array([self._row_of(t.id) for t in tracks])
+        boxes = np.array([t.box for t in tracks], dtype=np.float64)
+        heads = self.heads[rows]
+        self.log_scale[rows, heads] = 0.5 * np.log(np.maximum(box_area(boxes), 1.0))
+        self.times[rows, heads] = now
+        self.heads[rows] = (heads + 1) % self.window
+        self.counts[rows] = np.minimum(self.counts[rows] + 1, self.window)
+        self.last_seen[rows] = now
+
+        # Least-squares slope of log scale over time, all tracks at once; sample order does not matter
+        valid = np.arange(self.window)[None, :] < self.counts[rows, None]
+        n = np.maximum(valid.sum(axis=1), 1)
+        t = np.where(valid, self.times[rows] - now, 0.0)
+        y = np.where(valid, self.log_scale[rows], 0.0)
+        t_mean = t.sum(axis=1) / n
+        y_mean = y.sum(axis=1) / n
+        dt = np.where(valid, t - t_mean[:, None], 0.0)
+        dy = np.where(valid, y - y_mean[:, None], 0.0)
+        variance = (dt * dt).sum(axis=1)
+        slope = np.divide((dt * dy).sum(axis=1), variance, out=np.zeros(len(rows)), where=variance > 0)
+
+        ttc = np.full(len(rows), np.inf)
+        approaching = (slope > 0) & (self.counts[rows] >= MIN_SAMPLES)
+        # The fit describes the middle of the window, which lies -t_mean seconds in the past
+        ttc[approaching] = np.maximum(1.0 / slope[approaching] + t_mean[approaching], 0.0)
+        return ttc
+
+    def reset(self):
+        self._rows.clear()
+        self.owner[:] = -1
+        self.last_seen[:] = -np.inf
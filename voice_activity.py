@@ -0,0 +1,148 @@
+"""
+Background noise-floor tracking and voice-activity gating for voice commands.
+
+The launchers used to call recognizer.adjust_for_ambient_noise() at the start of
+every interaction, which costs a second of dead air before the user can speak.
+Instead, a shared NoiseFloor is seeded once when the background listener starts
+and is then kept up to date from the background recognizer and from the silent
+parts of every captured phrase. The VoiceActivityDetector trims captured audio
+down to its speech segments so silence and traffic noise are never sent to the
+recognizer.
+"""
+import threading
+import numpy as np
+import speech_recognition as sr
+
+FRAME_MS = 30  # Analysis frame length
+SPEECH_BAND_HZ = (300, 3400)  # Band that carries most of the energy of speech
+
+
+class NoiseFloor:
+    """Running estimate of the background noise energy (RMS of 16-bit samples)."""
+
+    def __init__(self, initial=300.0, alpha=0.05, ratio=1.5, minimum=50.0):
+        self.level = initial
+        self.alpha = alpha  # Weight of each new observation in the moving average
+        self.ratio = ratio  # Threshold = noise level * ratio
+        self.minimum = minimum
+        self._lock = threading.Lock()
+
+    def update(self, rms):
+        """Blend a new noise energy observation into the estimate."""
+        with self._lock:
+            self.level += self.alpha * (float(rms) - self.level)
+
+    def observe(self, energies):
+        """Update the estimate from the energies of frames classified as non-speech."""
+        if len(energies) == 0:
+            return
+        self.update(np.median(energies))
+
+    def threshold(self):
+        """Energy above which audio is considered to be speech."""
+        return max(self.minimum, self.level * self.ratio)
+
+    def calibrate(self, recognizer, source, duration=1.0):
+        """Seed the estimate from a one-off calibration (done once, at startup)."""
+        recognizer.adjust_for_ambient_noise(source, duration=duration)
+        with self._lock:
+            self.level = recognizer.energy_threshold / recognizer.dynamic_energy_ratio
+
+    def follow(self, recognizer):
+        """Track the dynamic threshold maintained by a continuously listening recognizer."""
+        self.update(recognizer.energy_threshold / recognizer.dynamic_energy_ratio)
+
+    def apply(self, recognizer):
+        """Configure a recognizer with the current estimate instead of recalibrating it."""
+        recognizer.energy_threshold = self.threshold()
+        recognizer.dynamic_energy_threshold = True
+
+
+class VoiceActivityDetector:
+    """Energy and speech-band based voice-activity detector working on sr.AudioData."""
+
+    def __init__(self, noise_floor, speech_ratio=2.0, band_ratio=0.5,
+                 min_speech_ms=120, hangover_ms=240, padding_ms=150):
+        self.noise_floor = noise_floor
+        self.speech_ratio = speech_ratio  # Frame energy must exceed noise level by this factor
+        self.band_ratio = band_ratio  # Minimum share of frame energy inside SPEECH_BAND_HZ
+        self.min_speech_frames = max(1, min_speech_ms // FRAME_MS)
+        self.hangover_frames = hangover_ms // FRAME_MS
+        self.padding_frames = padding_ms // FRAME_MS
+
+    def _frames(self, samples, sample_rate):
+        """Split samples into non-overlapping analysis frames (one row per frame)."""
+        # Chunks shorter than one frame (streaming reads) are analysed as a single frame
+        frame_len = max(1, min(sample_rate * FRAME_MS // 1000, len(samples)))
+        n_frames = len(samples) // frame_len
+        return samples[:n_frames * frame_len].reshape(n_frames, frame_len), frame_len
+
+    def frame_flags(self, samples, sample_rate):
+        """Return unsmoothed per-frame (speech flags, frame energies, frame length in samples)."""
+        frames, frame_len = self._frames(samples.astype(np.float32), sample_rate)
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.float32), frame_len
+        energies = np.sqrt(np.mean(frames * frames, axis=1))
+
+        # Traffic rumble and wind are loud but sit below the speech band
+        spectrum = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+        freqs = np.fft.rfftfreq(frame_len, 1.0 / sample_rate)
+        in_band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+        band_share = spectrum[:, in_band].sum(axis=1) / (spectrum.sum(axis=1) + 1e-9)
+
+        flags = (energies > self.noise_floor.level * self.speech_ratio) & (band_share >= self.band_ratio)
+        return flags, energies, frame_len
+
+    def classify(self, samples, sample_rate):
+        """Return per-frame (speech flags, frame energies, frame length in samples)."""
+        flags, energies, frame_len = self.frame_flags(samples, sample_rate)
+        return self._smooth(flags), energies, frame_len
+
+    def _smooth(self, raw):
+        """Drop speech runs that are too short and bridge short pauses inside words."""
+        speech = np.zeros_like(raw)
+        run_start = None
+        silence = 0
+        for i, active in enumerate(raw):
+            if active:
+                if run_start is None:
+                    run_start = i
+                silence = 0
+            elif run_start is not None:
+                silence += 1
+                if silence > self.hangover_frames:
+                    end = i - silence + 1
+                    if end - run_start >= self.min_speech_frames:
+                        speech[run_start:end] = True
+                    run_start = None
+                    silence = 0
+        if run_start is not None:
+            end = len(raw) - silence
+            if end - run_start >= self.min_speech_frames:
+                speech[run_start:end] = True
+        return speech
+
+    def gate(self, audio):
+        """
+        Return a new AudioData holding only the speech segments of `audio`, or None
+        if it contains no speech. Non-speech frames update the noise floor.
+        """
+        raw = audio.get_raw_data(convert_width=2)
+        samples = np.frombuffer(raw, dtype=np.int16)
+        speech, energies, frame_len = self.classify(samples, audio.sample_rate)
+        self.noise_floor.observe(energies[~speech])
+        if not speech.any():
+            return None
+
+        # Keep some context around each segment so word onsets are not clipped
+        keep = speech.copy()
+        for shift in range(1, self.padding_frames + 1):
+            keep[:-shift] |= speech[shift:]
+            keep[shift:] |= speech[:-shift]
+        kept = samples[:len(keep) * frame_len].reshape(len(keep), frame_len)[keep]
+        return sr.AudioData(kept.tobytes(), audio.sample_rate, 2)
+
+
+# Shared by the background listener and the interactive sub-command listener
+noise_floor = NoiseFloor()
+vad = VoiceActivityDetector(noise_floor)